@@ -0,0 +1,235 @@
+#
+# version 1.0 -- 2026-10-18 --
+#   the "mask + statistics" step of the color-target detection behind a
+#   small kernel interface: NumPy, OpenCV and, when numba is installed, a
+#   JIT-compiled single pass. The fastest kernel passing the golden checks
+#   is chosen on first use by a short benchmark, the choice is cached per
+#   machine.
+#
+
+import os, sys, json, time, platform
+import cv2
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None   # noyau compilé indisponible
+
+class NumpyKernel:
+    '''Masque par comparaisons NumPy, statistiques par les projections du
+       masque sur les lignes et les colonnes.'''
+
+    name = "numpy"
+
+    def box_stats(self, pixelsTab, lower, upper):
+        '''Statistiques (nombre, somme x, somme y, (x, y, w, h)) des pixels
+           de <pixelsTab> dont la couleur est dans la boîte [lower, upper].'''
+        mask = ((pixelsTab >= lower) & (pixelsTab <= upper)).all(axis=2)
+        cols = np.count_nonzero(mask, axis=0)
+        rows = np.count_nonzero(mask, axis=1)
+        count = int(cols.sum())
+        if count == 0: return 0., 0., 0., (0, 0, 0, 0)
+        X, = np.nonzero(cols)
+        Y, = np.nonzero(rows)
+        return (float(count), float(cols @ np.arange(len(cols))),
+                float(rows @ np.arange(len(rows))),
+                (int(X[0]), int(Y[0]), int(X[-1]-X[0]+1), int(Y[-1]-Y[0]+1)))
+
+class OpenCVKernel:
+    '''Masque par cv2.inRange, statistiques par cv2.moments et
+       cv2.boundingRect.'''
+
+    name = "opencv"
+
+    def box_stats(self, pixelsTab, lower, upper):
+        mask = cv2.inRange(pixelsTab, lower, upper)
+        m = cv2.moments(mask, binaryImage=True)
+        return m['m00'], m['m10'], m['m01'], cv2.boundingRect(mask)
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _numba_box_stats(pixelsTab, lower, upper):
+        height, width = pixelsTab.shape[:2]
+        count, sum_x, sum_y = 0, 0, 0
+        x0, y0, x1, y1 = width, height, -1, -1
+        for y in range(height):
+            for x in range(width):
+                inside = True
+                for c in range(3):
+                    v = pixelsTab[y, x, c]
+                    if v < lower[c] or v > upper[c]:
+                        inside = False
+                        break
+                if inside:
+                    count += 1
+                    sum_x += x
+                    sum_y += y
+                    if x < x0: x0 = x
+                    if x > x1: x1 = x
+                    if y < y0: y0 = y
+                    y1 = y
+        return count, sum_x, sum_y, x0, y0, x1, y1
+
+class NumbaKernel:
+    '''Masque et statistiques en une seule passe sur les pixels, compilée
+       par numba (seulement si numba est installé).'''
+
+    name = "numba"
+
+    def box_stats(self, pixelsTab, lower, upper):
+        count, sum_x, sum_y, x0, y0, x1, y1 = _numba_box_stats(pixelsTab,
+                                                               lower, upper)
+        if count == 0: return 0., 0., 0., (0, 0, 0, 0)
+        return (float(count), float(sum_x), float(sum_y),
+                (int(x0), int(y0), int(x1-x0+1), int(y1-y0+1)))
+
+def available_kernels():
+    '''Noyaux utilisables sur cette machine.'''
+    kernels = [NumpyKernel(), OpenCVKernel()]
+    if numba is not None: kernels.append(NumbaKernel())
+    return kernels
+
+def reference_box_stats(pixelsTab, lower, upper):
+    '''Statistiques de référence, par les coordonnées de tous les pixels de
+       la boîte (lent, sert aux vérifications des noyaux).'''
+    Y, X = np.nonzero(((pixelsTab >= lower) & (pixelsTab <= upper)).all(axis=2))
+    if len(X) == 0: return 0., 0., 0., (0, 0, 0, 0)
+    return (float(len(X)), float(X.sum()), float(Y.sum()),
+            (int(X.min()), int(Y.min()), int(X.max()-X.min()+1),
+             int(Y.max()-Y.min()+1)))
+
+def sample_frame(width=1280, height=720):
+    '''Frame de test : fond en dégradé, une cible pleine et du bruit sur un
+       quart de l'image.'''
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None]
+    frame[..., 1] = 120
+    cv2.circle(frame, (width//3, height//2), height//20, (200, 30, 40), -1)
+    rng = np.random.default_rng(0)
+    frame[:height//2, :width//2] = rng.integers(0, 256, (height//2, width//2, 3),
+                                                dtype=np.uint8)
+    return frame
+
+def golden_cases():
+    '''Cas des vérifications (frame, borne basse, borne haute) : frame de
+       test, frame non contiguë (fenêtre), bornes 0 et 255, aucun pixel,
+       pixels sur les bords de l'image.'''
+    frame = sample_frame()
+    edges = np.zeros((48, 64, 3), dtype=np.uint8)
+    edges[0, 0] = edges[-1, -1] = edges[0, -1] = (255, 255, 255)
+    box = lambda rgb, eps: (np.clip(np.subtract(rgb, eps), 0, 255).astype(np.uint8),
+                            np.clip(np.add(rgb, eps), 0, 255).astype(np.uint8))
+    return [(frame, *box((200, 30, 40), 10)),
+            (frame, *box((120, 120, 120), 30)),
+            (frame[100:400, 200:900], *box((200, 30, 40), 25)),
+            (frame, *box((255, 0, 0), 50)),
+            (frame, *box((0, 255, 255), 0)),
+            (edges, *box((255, 255, 255), 0)),
+            (edges, *box((0, 0, 0), 0))]
+
+def golden_check(kernel):
+    '''True si le noyau <kernel> donne les statistiques de référence sur
+       tous les cas de golden_cases.'''
+    try:
+        for pixelsTab, lower, upper in golden_cases():
+            count, sum_x, sum_y, rect = kernel.box_stats(pixelsTab, lower, upper)
+            ref_count, ref_x, ref_y, ref_rect = reference_box_stats(pixelsTab,
+                                                                    lower, upper)
+            if (count, sum_x, sum_y) != (ref_count, ref_x, ref_y) or \
+               tuple(rect) != ref_rect:
+                return False
+    except Exception as e:
+        print("noyau {} : {}".format(kernel.name, e))
+        return False
+    return True
+
+def benchmark(kernel, repeat=20):
+    '''Temps moyen [s] du noyau <kernel> sur la frame de test, après un
+       premier appel (compilation éventuelle).'''
+    frame = sample_frame()
+    lower, upper = np.array([190, 20, 30], np.uint8), np.array([210, 40, 50], np.uint8)
+    kernel.box_stats(frame, lower, upper)
+    t0 = time.perf_counter()
+    for _ in range(repeat): kernel.box_stats(frame, lower, upper)
+    return (time.perf_counter() - t0)/repeat
+
+def machine_key():
+    '''Identifiant de la machine et des versions des bibliothèques : le
+       choix du noyau est refait quand il change.'''
+    return "|".join((platform.node(), platform.machine(), str(os.cpu_count()),
+                     sys.version.split()[0], np.__version__, cv2.__version__,
+                     numba.__version__ if numba is not None else "-"))
+
+# fichier du choix du noyau, propre à chaque machine :
+kernel_cache = os.path.join(os.path.expanduser("~"), ".VideoTracker", "kernel.json")
+
+_kernel = None  # noyau choisi dans ce processus
+
+def autotune(verbose=True):
+    '''Vérifie les noyaux disponibles (golden_check), mesure ceux qui
+       passent et renvoie le plus rapide.'''
+    timings = []
+    for kernel in available_kernels():
+        if not golden_check(kernel):
+            print("noyau {} écarté : résultats différents de la référence"\
+                  .format(kernel.name))
+            continue
+        timings.append((benchmark(kernel), kernel))
+    if verbose:
+        print("noyaux de détection : " + ", ".join(
+              "{} {:.2f} ms".format(kernel.name, 1000*dt) for dt, kernel in timings))
+    return min(timings, key=lambda timing: timing[0])[1]
+
+def detection_kernel():
+    '''Noyau de détection de ce processus : celui choisi pour cette machine
+       dans <kernel_cache>, sinon choisi par autotune et noté dans
+       <kernel_cache>.'''
+    global _kernel
+    if _kernel is not None: return _kernel
+    kernels = {kernel.name: kernel for kernel in available_kernels()}
+    key = machine_key()
+    try:
+        with open(kernel_cache) as f:
+            name = json.load(f).get(key)
+    except (OSError, ValueError):
+        name = None
+    if name in kernels:
+        _kernel = kernels[name]
+        return _kernel
+
+    _kernel = autotune()
+    print("noyau de détection choisi : {}".format(_kernel.name))
+    try:
+        try:
+            with open(kernel_cache) as f: choices = json.load(f)
+        except (OSError, ValueError):
+            choices = {}
+        choices[key] = _kernel.name
+        os.makedirs(os.path.dirname(kernel_cache), exist_ok=True)
+        tmp = kernel_cache + ".{}.tmp".format(os.getpid())
+        with open(tmp, "w") as f: json.dump(choices, f, indent=1)
+        os.replace(tmp, kernel_cache)
+    except OSError:
+        print("choix du noyau non écrit dans '{}'".format(kernel_cache))
+    return _kernel
+
+def set_detection_kernel(name=None):
+    '''Impose le noyau <name> dans ce processus ; None : choix par la
+       machine (cf. detection_kernel).'''
+    global _kernel
+    if name is None:
+        _kernel = None
+        return
+    kernels = {kernel.name: kernel for kernel in available_kernels()}
+    if name not in kernels:
+        raise Exception("noyau de détection <{}> indisponible".format(name))
+    _kernel = kernels[name]
+
+if __name__ == "__main__":
+    # Vérification et mesure de tous les noyaux : python DetectionKernels.py
+    for kernel in available_kernels():
+        print("{:8s}: vérifications {}".format(kernel.name,
+              "réussies" if golden_check(kernel) else "ÉCHOUÉES"))
+    best = autotune()
+    print("le plus rapide :", best.name)
@@ -0,0 +1,390 @@
+#
+# version 1.0 -- 2026-10-18 --
+#   frame sources: PNG images of a directory, or frames read directly
+#   from the video file without writing any image file.
+#   add FrameCube: all the frames in one memory-mapped .npy file.
+#   add video_key, the key of the cache of the split images.
+#   add read_frames to read a range of frames of a cv2.VideoCapture.
+#   the frames can be cropped and downscaled when they are read.
+#   add the frame index of a video: timestamps and key frames of all frames.
+#   add frame fingerprints to detect the duplicated frames.
+#   add the JSON manifest of a directory of split images.
+#   a frame source can be sent to another process: it is opened again there.
+#   the manifest check at open only looks at the first and last files, the
+#   size of a PNG image is checked when it is read.
+#   the frame fingerprint is a hash of the whole frame.
+#
+
+import os, json, hashlib
+import cv2
+import numpy as np
+
+def video_key(video_path, split_params=None, block_size=1<<20):
+    '''Clé du découpage d'une vidéo : empreinte de sa taille, de sa date de
+       modification et de 3 blocs de son contenu (début, milieu, fin), ce qui
+       évite de relire tout le fichier, et des paramètres du découpage.'''
+    stat = os.stat(video_path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update("{}:{}".format(stat.st_size, stat.st_mtime_ns).encode())
+    if split_params is not None: h.update(repr(split_params).encode())
+    with open(video_path, "rb") as F:
+        for offset in (0, stat.st_size//2, stat.st_size - block_size):
+            F.seek(max(0, offset))
+            h.update(F.read(block_size))
+    return h.hexdigest()
+
+def nb_frames_in_range(nframes, first, last, step):
+    '''Nombre de frames <first>, <first>+step, ... <= <last> (None : jusqu'à
+       la fin) d'une vidéo de <nframes> frames.'''
+    if last is None or last > nframes: last = nframes
+    return max(0, (last - first)//step + 1)
+
+def crop_and_scale(frame, roi=None, factor=1):
+    '''Recadre <frame> sur la région roi = (x, y, w, h) puis réduit sa taille
+       d'un facteur entier <factor> (largeur et hauteur sont d'abord ramenées
+       à un multiple de <factor>).'''
+    if roi is None and factor == 1: return frame
+    x, y, w, h = roi if roi is not None else (0, 0, frame.shape[1], frame.shape[0])
+    w, h = w - w % factor, h - h % factor
+    frame = frame[y:y+h, x:x+w]
+    if factor > 1:
+        return cv2.resize(frame, (w//factor, h//factor), interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(frame)
+
+def ingest_size(width, height, roi=None, factor=1):
+    '''Taille (largeur, hauteur) des frames renvoyées par crop_and_scale.'''
+    if roi is not None: width, height = roi[2], roi[3]
+    return width//factor, height//factor
+
+def read_frames(video, first=1, last=None, step=1, roi=None, factor=1):
+    '''Générateur des couples (n° frame, frame BGR) pour les frames <first>,
+       <first>+step, ... <= <last> (None : jusqu'à la fin) de l'objet
+       cv2.VideoCapture <video>. On se positionne directement sur <first> et
+       les frames sautées sont seulement lues avec grab(), sans retrieve().
+       Les frames sont recadrées et réduites par crop_and_scale.'''
+    if first > 1: video.set(cv2.CAP_PROP_POS_FRAMES, first-1)
+    num = first
+    while last is None or num <= last:
+        returnVal, frame = video.read()
+        if not returnVal: return
+        yield num, crop_and_scale(frame, roi, factor)
+        num += step
+        if last is not None and num > last: return
+        for _ in range(step-1):
+            if not video.grab(): return
+
+# fichier des empreintes (cf. frame_fingerprint) des images découpées, une
+# par image dans l'ordre des rangs :
+fingerprints_name = "fingerprints_full.npy"
+
+def frame_fingerprint(frame):
+    '''Empreinte (entier 64 bits) d'une frame : hash de tous ses pixels et
+       de sa taille. Deux frames de même empreinte sont identiques, à une
+       collision de hash près.'''
+    h = hashlib.blake2b(repr(frame.shape).encode(), digest_size=8)
+    h.update(np.ascontiguousarray(frame).data)
+    return np.frombuffer(h.digest(), dtype='<u8')[0]
+
+def save_fingerprints(images_dir, fingerprints):
+    '''Écrit dans <images_dir> les empreintes des images de rang 1, 2...
+       données par le dictionnaire <fingerprints> (rang -> empreinte).'''
+    tab = np.array([fingerprints[i] for i in sorted(fingerprints)], dtype='<u8')
+    np.save(images_dir + fingerprints_name, tab)
+
+def load_fingerprints(images_dir, nb_frames):
+    '''Renvoie les empreintes des <nb_frames> images de <images_dir>, ou None
+       si elles n'ont pas été calculées lors du découpage.'''
+    try:
+        tab = np.load(images_dir + fingerprints_name)
+    except (OSError, ValueError):
+        return None
+    return tab if len(tab) == nb_frames else None
+
+manifest_name    = "manifest.json"
+manifest_version = 1
+
+def file_checksum(path, block_size=1<<20):
+    '''Empreinte blake2b du contenu du fichier <path>.'''
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as F:
+        for block in iter(lambda: F.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def write_manifest(images_dir, dico_video, checksum=False):
+    '''Écrit le manifeste <manifest.json> du dossier <images_dir> à la fin
+       d'un découpage : version du format, méta-données de la vidéo, nombre
+       de frames et liste ordonnée des fichiers (PNG ou fichier .npy) avec
+       leur taille et, si <checksum> est vrai, leur empreinte.
+       Renvoie le manifeste.'''
+    if FrameCube.exists(images_dir):
+        storage = "cube"
+        names   = [FrameCube.cube_name, FrameCube.header_name]
+        with open(images_dir + FrameCube.header_name, "r") as F:
+            nframes = json.load(F)["nframes"]
+    else:
+        storage = "png"
+        names   = sorted(f for f in os.listdir(images_dir) if f.endswith('.png'))
+        nframes = len(names)
+    files = []
+    for name in names:
+        entry = {"name": name, "size": os.path.getsize(images_dir + name)}
+        if checksum: entry["blake2b"] = file_checksum(images_dir + name)
+        files.append(entry)
+    manifest = {"version": manifest_version,
+                "storage": storage,
+                "nframes": nframes,
+                "video":   dico_video,
+                "files":   files}
+    # écriture atomique : un manifeste présent est toujours complet
+    with open(images_dir + manifest_name + ".tmp", "w") as F:
+        json.dump(manifest, F, indent=1)
+    os.replace(images_dir + manifest_name + ".tmp", images_dir + manifest_name)
+    return manifest
+
+def read_manifest(images_dir):
+    '''Renvoie le manifeste du dossier <images_dir>, ou None s'il n'existe
+       pas, s'il est illisible ou d'une version inconnue. Les listes JSON des
+       méta-données de la vidéo redeviennent des tuples.'''
+    try:
+        with open(images_dir + manifest_name, "r") as F:
+            manifest = json.load(F)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != manifest_version: return None
+    manifest["video"] = {k: tuple(v) if isinstance(v, list) else v
+                         for k, v in manifest["video"].items()}
+    return manifest
+
+def check_manifest(images_dir, manifest, deep=False, full=False):
+    '''Renvoie la liste des fichiers du manifeste manquants ou modifiés
+       (taille différente ou, si <deep> est vrai, empreinte différente).
+       Seuls le premier et le dernier fichier sont vérifiés, sauf si <full>
+       est vrai : une image manquante ou modifiée est sinon détectée quand
+       elle est lue (cf. ImagesDirectory). Un seul os.stat par fichier
+       vérifié, sans lister le dossier.'''
+    problems = []
+    entries = manifest["files"]
+    if not full and len(entries) > 2: entries = [entries[0], entries[-1]]
+    for entry in entries:
+        path = images_dir + entry["name"]
+        try:
+            if os.stat(path).st_size != entry["size"] or \
+               (deep and "blake2b" in entry and file_checksum(path) != entry["blake2b"]):
+                problems.append(entry["name"])
+        except OSError:
+            problems.append(entry["name"])
+    return problems
+
+frame_index_dtype = np.dtype([('pts', 'f8'),   # timestamp [ms]
+                              ('pos', 'i4'),   # rang dans l'ordre de décodage
+                              ('key', '?')])   # image clé ou pas
+
+def build_frame_index(video_path):
+    '''Index des frames d'une vidéo construit en une passe : pour chaque frame,
+       dans l'ordre de présentation, son timestamp CAP_PROP_POS_MSEC, son rang
+       dans l'ordre de décodage et si c'est une image clé.
+       Avec le backend FFMPEG les paquets sont lus sans être décodés
+       (CAP_PROP_FORMAT = -1), sinon les frames sont lues avec grab() et
+       les images clés ne sont pas connues (toutes à False).'''
+    try:
+        video = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        raw = video.isOpened() and hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME")
+    except (TypeError, cv2.error):
+        raw = False
+    if not raw: video = cv2.VideoCapture(video_path)
+
+    pts, keys = [], []
+    while video.grab():
+        pts.append(video.get(cv2.CAP_PROP_POS_MSEC))
+        keys.append(raw and bool(video.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+    video.release()
+
+    index = np.zeros(len(pts), dtype=frame_index_dtype)
+    index['pts'] = pts
+    index['pos'] = np.arange(len(pts))
+    index['key'] = keys
+    # les paquets bruts sont dans l'ordre de décodage :
+    index.sort(order='pts', kind='stable')
+    return index
+
+def load_frame_index(video_path):
+    '''Renvoie l'index des frames de la vidéo, lu dans le fichier
+       <video>.index.npy s'il est plus récent que la vidéo, sinon construit
+       par build_frame_index et écrit à côté de la vidéo si c'est possible.'''
+    index_path = video_path + ".index.npy"
+    try:
+        if os.path.getmtime(index_path) >= os.path.getmtime(video_path):
+            return np.load(index_path)
+    except (OSError, ValueError):
+        pass
+    index = build_frame_index(video_path)
+    try:
+        np.save(index_path, index)
+    except OSError:
+        print("Index des frames non écrit dans '{}'".format(index_path))
+    return index
+
+class ImagesDirectory:
+    '''Source d'images : les fichiers PNG issus du découpage d'une vidéo.
+       La liste des fichiers et leurs tailles sont données par le manifeste
+       du dossier, sinon le dossier est listé. La taille de chaque image est
+       vérifiée quand elle est lue.'''
+
+    def __init__(self, images_dir, images_format, images_list=None,
+                 images_sizes=None):
+        self.images_dir  = images_dir       # le dossier des images
+        self.images_sizes = images_sizes    # tailles des fichiers (ou None)
+        if images_list is None:
+            images_list = [ f for f in os.listdir(images_dir) if f.endswith('.png')]
+            images_list.sort()
+        self.images_list = images_list
+        self.nb_frames   = len(self.images_list)
+        self.__fingerprints = load_fingerprints(images_dir, self.nb_frames)
+
+    def __reduce__(self):
+        # pickle : la source est réouverte dans l'autre processus
+        return (ImagesDirectory, (self.images_dir, None, self.images_list,
+                                  self.images_sizes))
+
+    def path(self, index):
+        '''Chemin du fichier de l'image de rang <index> (à partir de 1).'''
+        return self.images_dir + self.images_list[index-1]
+
+    def fingerprint(self, index):
+        '''Empreinte de l'image de rang <index> calculée lors du découpage
+           (None si elle n'est pas connue).'''
+        if self.__fingerprints is None: return None
+        return self.__fingerprints[index-1]
+
+    def read(self, index):
+        '''Renvoie le tableau RGB de l'image de rang <index> (à partir de 1).'''
+        if self.images_sizes is not None:
+            try:
+                size = os.stat(self.path(index)).st_size
+            except OSError:
+                size = None
+            if size != self.images_sizes[index-1]:
+                raise Exception("image {} manquante ou modifiée depuis le "
+                                "découpage".format(self.path(index)))
+        frame = cv2.imread(self.path(index))
+        if frame is None:
+            raise Exception("impossible de lire l'image {}".format(self.path(index)))
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        pass
+
+
+class VideoStream:
+    '''Source d'images : les frames sont lues directement dans le fichier
+       vidéo avec cv2.VideoCapture, sans écrire de fichiers images. Elles
+       peuvent être recadrées et réduites (cf. crop_and_scale).
+       Avec l'index des frames (cf. build_frame_index) le nombre de frames
+       est exact et on ne fait un seek que s'il y a une image clé entre la
+       position courante et la frame demandée.'''
+
+    max_grab = 50  # sans index, au-delà de cet écart on fait un seek
+
+    def __init__(self, video_path, roi=None, factor=1, frame_index=None):
+        self.video_path = video_path
+        self.__roi      = roi     # région (x, y, w, h) gardée
+        self.__factor   = factor  # facteur de réduction
+        self.__video    = cv2.VideoCapture(video_path)
+        self.__index    = frame_index
+        self.__keys     = None    # images clés de l'index des frames
+        if frame_index is not None:
+            self.nb_frames = len(frame_index)
+            if frame_index['key'].any(): self.__keys = frame_index['key']
+        else:
+            self.nb_frames = int(self.__video.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.__next     = 1   # rang de la prochaine frame lue par read()
+
+    def __reduce__(self):
+        # pickle : la vidéo est réouverte dans l'autre processus
+        return (VideoStream, (self.video_path, self.__roi, self.__factor,
+                              self.__index))
+
+    def path(self, index):
+        return None
+
+    def fingerprint(self, index):
+        return None
+
+    def __must_seek(self, index):
+        if index < self.__next: return True
+        if self.__keys is None: return index - self.__next > VideoStream.max_grab
+        # après un seek le décodage repart de la dernière image clé avant
+        # <index> : c'est plus court que des grab() si elle est après __next
+        return self.__keys[self.__next:index].any()
+
+    def read(self, index):
+        '''Renvoie le tableau RGB de la frame de rang <index> (à partir de 1).
+           Les frames consécutives sont lues séquentiellement, les sauts sans
+           image clé sont franchis avec grab() (pas de retrieve()) et les
+           autres avec un seek.'''
+        if self.__must_seek(index):
+            self.__video.set(cv2.CAP_PROP_POS_FRAMES, index-1)
+            self.__next = index
+        while self.__next < index:
+            self.__video.grab()
+            self.__next += 1
+        ret, frame = self.__video.read()
+        if not ret:
+            raise Exception("impossible de lire la frame {} de {}"\
+                            .format(index, os.path.basename(self.video_path)))
+        self.__next += 1
+        frame = crop_and_scale(frame, self.__roi, self.__factor)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        self.__video.release()
+
+
+class FrameCube:
+    '''Source d'images : toutes les frames RGB de la vidéo rangées dans un
+       seul fichier <frames.npy> de forme (nframes, H, W, 3), ouvert en
+       mémoire mappée. Le fichier <frames.json> donne le nombre de frames
+       réellement écrites lors du découpage. Lire une frame ne demande ni
+       décodage ni ouverture de fichier.'''
+
+    cube_name   = "frames.npy"
+    header_name = "frames.json"
+
+    def __init__(self, images_dir):
+        self.images_dir = images_dir
+        with open(images_dir + FrameCube.header_name, "r") as F:
+            header = json.load(F)
+        self.__cube    = np.load(images_dir + FrameCube.cube_name, mmap_mode='r')
+        self.nb_frames = header["nframes"]
+        self.__fingerprints = load_fingerprints(images_dir, self.nb_frames)
+
+    def __reduce__(self):
+        # pickle : le fichier est réouvert (mappé) dans l'autre processus
+        return (FrameCube, (self.images_dir,))
+
+    @staticmethod
+    def exists(images_dir):
+        return os.path.isfile(images_dir + FrameCube.header_name)
+
+    @staticmethod
+    def write_header(images_dir, nframes, width, height):
+        header = {"nframes": nframes, "width": width, "height": height,
+                  "dtype": "uint8", "order": "RGB"}
+        with open(images_dir + FrameCube.header_name, "w") as F:
+            json.dump(header, F)
+
+    def path(self, index):
+        return None
+
+    def fingerprint(self, index):
+        if self.__fingerprints is None: return None
+        return self.__fingerprints[index-1]
+
+    def read(self, index):
+        '''Renvoie le tableau RGB (vue sur le fichier, sans copie) de la
+           frame de rang <index> (à partir de 1).'''
+        return self.__cube[index-1]
+
+    def close(self):
+        self.__cube = None
@@ -2,36 +2,121 @@
 # version 1.3 -- 2019-05-07 -- JLC --
 #   add Export CVS
 #
+# version 1.4 -- 2026-10-18 --
+#   images are read through a FrameSource: PNG files of a directory or
+#   frames streamed directly from the video file (no PNG round-trip).
+#   the frames can be stored in a memory-mapped .npy file (FrameCube).
+#   the split images are cached in a directory named after the video key.
+#   the range first/last/step of the frames to split can be chosen up front.
+#   the video can be cropped to a region of interest and downscaled at ingest.
+#   the video metadata and the time of the frames come from the frame index.
+#   browsing uses low-resolution proxies of the frames made in background.
+#   the metadata and the list of the split images are read in a JSON manifest.
+#   the split images can be tracked by a pool of processes.
+#   the target can be searched in a window around its predicted position.
+#   several targets of different colors can be tracked in one extraction.
+#   the target color can be modeled in HSV, Lab or by a Mahalanobis distance.
+#   the target can be searched coarse-to-fine.
+#   the statistics of the frames are cached: a new extraction, with any
+#   algorithm, does not read the images again.
+#   the epsilon sweep gives the trajectories for all the values of epsilon:
+#   changing epsilon then updates the plots without reading the images.
+#   the mask and the center of the targets are previewed on the displayed
+#   image, computed on a subsampled copy of the frame.
+#   add the 'mouvement' algorithm: the moving target is found by a
+#   background subtraction, whatever its color.
+#   add the 'motif' algorithm: the selected patch is followed by template
+#   matching around its last position.
+#   the manifest of a split is written only when the split thread has
+#   written all the frames.
+#   only the statistics of full-frame searches are saved in the sidecar file.
+#   the mask preview subsamples the last frame read in full resolution,
+#   never the JPEG proxy.
+#   after an epsilon sweep, a new epsilon only recomputes the positions
+#   from the sweep and redraws the displayed plot.
+#   frameIndex.npy is only written when the video has a frame index.
+#   the split range dialog keeps the first frame before the last one, an
+#   empty range is refused.
+#   the epsilon sweep is only offered to the color algorithms, it is kept
+#   only when all the frames were swept.
+#   the statistics of the frames are saved when the extraction thread computed
+#   them all on the full frame.
+#
 
 import cv2
-
-import scipy
-if scipy.__version__ < "1.3":
-    from scipy.misc import imread
-else:
-    import imageio
-    from imageio import imread
-    
 import numpy as np
-import os
+import os, ast
 
 from PyQt5.Qt import (QWidget, QPushButton, QComboBox, QRubberBand, QLabel, QFrame,
                       QVBoxLayout, QHBoxLayout, QGridLayout, QLineEdit, QFileDialog,
-                      QMessageBox, QSpinBox, QIcon, QPixmap, QPainter, QPen,
-                      Qt,QEvent, QRect, QSize, QColor)
+                      QMessageBox, QSpinBox, QIcon, QPixmap, QImage, QPainter, QPen,
+                      QDialog, QDialogButtonBox,
+                      Qt,QEvent, QRect, QRectF, QSize, QColor)
 
 from ProgressBar import ProgressBar
+from ThreadedWork import ProxyFramesThread, TargetsPositions
+from TargetDetection import (ColorClassifier, centers_from_stats, stats_prefix,
+                             stats_key, save_frame_stats, load_frame_stats,
+                             sweep_stats, target_mask, mask_stats,
+                             center_from_stats, MotionDetector, TemplateTracker,
+                             subsample)
+from FrameSource import (ImagesDirectory, VideoStream, FrameCube, video_key,
+                         load_frame_index, write_manifest, read_manifest,
+                         check_manifest, frame_index_dtype, nb_frames_in_range)
 
 class staticproperty(property):
     """ Création du décorateur '@staticproperty'"""
     def __get__(self, cls, owner):
         return staticmethod(self.fget).__get__(None, owner)()
 
+class SplitRangeDialog(QDialog):
+    '''Boîte de dialogue pour choisir les frames à découper : la première,
+       la dernière et le pas.'''
+
+    def __init__(self, nframes, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Frames à découper")
+
+        self.first = QSpinBox(self)
+        self.last  = QSpinBox(self)
+        self.step  = QSpinBox(self)
+        for spin, prefix, value in ((self.first, "first: ", 1),
+                                    (self.last,  "last: ",  nframes),
+                                    (self.step,  "step: ",  1)):
+            spin.setRange(1, max(1, nframes))
+            spin.setPrefix(prefix)
+            spin.setValue(value)
+        # la première frame reste avant la dernière :
+        self.first.valueChanged.connect(self.last.setMinimum)
+        self.last.valueChanged.connect(self.first.setMaximum)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.first)
+        hbox.addWidget(self.step)
+        hbox.addWidget(self.last)
+        vbox = QVBoxLayout()
+        vbox.addLayout(hbox)
+        vbox.addWidget(buttons)
+        self.setLayout(vbox)
+
+    def first_last_step(self):
+        return (self.first.value(), self.last.value(), self.step.value())
+
+
 class ImageDisplay(QWidget):
 
     video_infos     = ['vidéo : {}','nb frames : {}','taille : {}','FPS : {}','durée : {:.2f} sec']
     video_keys      = ['videoname','nframes','size','fps','duration']
-    algo_traj       = ['barycentre','minmax']
+    algo_traj       = ['barycentre','minmax','mouvement','motif']
+    motion_algo     = 'mouvement' # cible mobile trouvée par soustraction du fond
+    template_algo   = 'motif'     # sélection suivie par corrélation
+    color_models    = ['RGB'] + list(ColorClassifier.spaces)
+    proxy_width     = 960  # au-delà de cette largeur on navigue avec des proxies
+    preview_RGBA    = (255, 0, 255, 140) # couleur de l'aperçu du masque
 
     def __init__(self, mainWindow):
 
@@ -56,6 +141,7 @@ class ImageDisplay(QWidget):
         self.btn_clear = QPushButton(QIcon("icones/clear.png"), "Effacer courbes...", self)
         self.btn_exportCSV = QPushButton(QIcon("icones/exportCSV.png"), "Export CSV", self)
         self.btn_algo      = QComboBox(self)
+        self.btn_color     = QComboBox(self) # modèle de la couleur de la cible
         self.image_index   = QLabel(self)
         
         # widget QSpinBox
@@ -66,12 +152,31 @@ class ImageDisplay(QWidget):
         # QLabel to display the target color
         self.target_color_label = QLabel("target color",parent=self) 
         self.picked_color       = QLabel(self)
+
+        # cibles suivies ensemble (une couleur par cible) :
+        self.btn_add_target = QPushButton("Ajouter cible", self)
+        self.targets_color  = QLabel(self) # couleurs des cibles ajoutées
+        self.btn_target     = QComboBox(self) # choix de la cible courante
+        self.targets_RGB    = []   # couleurs des cibles à suivre
+        self.targets_pix    = []   # pixels sélectionnés de ces cibles
+        self.picked_RGB     = None # couleur choisie sur l'image
+        self.target_pix     = None # pixels sélectionnés sur l'image
+        self.target_corner  = None # coin haut gauche (x, y) de la sélection
     
         self.video_path     = None  # Chemin de la dernière vidéo
         self.images_dir     = None  # Dossier contenant les images
+        self.frame_source   = None  # source des images affichées (cf. FrameSource)
         self.__img_idx      = None  # Rang de l'image affichée
         self.img_path       = None  # nom du chemin de l'image courante
         self.nb_img         = None  # nombre d'images
+        self.proxies        = {}    # rang -> frame réduite encodée en JPEG
+        self.proxy_factor   = 1     # facteur de réduction des proxies
+        self.__pixmap       = None  # image affichée, sans l'aperçu du masque
+        self.__preview_frame   = None # (source, rang, frame sous-échantillonnée, facteur)
+        self.__last_frame      = None # (source, rang, dernière frame lue en entier)
+        self.__preview_targets = None # (clé, cibles) de l'aperçu du masque
+        self.display_factor = 1     # facteur de réduction de l'image affichée
+        self.__proxy_thread = None  # thread de calcul des proxies
 
         self.video_name     = None  # nom de la video ("aaaaaa.mp4")
         self.video_nframes  = None  # nombre d'images dans la video
@@ -80,6 +185,8 @@ class ImageDisplay(QWidget):
         self.video_duration = None  # durée de la video en secondes
         self.videoLabels    = []    # liste de QLabel contenant les infos vidéo
         self.dico_video     = {}    # dictionnaire des méta-données
+        self.frame_index    = None  # index des frames (cf. FrameSource.build_frame_index)
+        self.manifest       = None  # manifeste du dossier des images
 
         self.dico_unit      = {}    # dictionary "pixels", "mm"
         self.scale_pixel    = None  # nombre de pixels pour conversion en mm
@@ -90,11 +197,19 @@ class ImageDisplay(QWidget):
 
         self.lbl_epsilon    = None  # label epsilon
         self.epsi_spin      = None  # boite de choix de epsilon    
+        self.btn_sweep      = QPushButton("Balayage epsilon", self)
+        self.sweep          = None  # (couleurs, rang -> tableaux epsilon_sweep)
+
+        self.ingest_roi     = None  # région (x, y, w, h) de la vidéo à garder
+        self.btn_roi        = QPushButton("Sélection ROI", self)
+        self.downscale_spin = QSpinBox(self) # facteur de réduction des frames
+        self.btn_ingest     = QPushButton("Recadrer la vidéo", self)
 
         # créer l'onglet de visualisation image """
         self.__initUI()
         self.scaleInfoVisible(False)
         self.__epsilonVisible(False)
+        self.__ingestVisible(False)
 
     def __initUI(self):
 
@@ -107,9 +222,13 @@ class ImageDisplay(QWidget):
         line1 = QHBoxLayout()
         line1.addStretch(1)
         line1.addWidget(self.btn_algo)
+        line1.addWidget(self.btn_color)
         line1.addWidget(self.btn_traj)
         line1.addWidget(self.target_color_label)
         line1.addWidget(self.picked_color)
+        line1.addWidget(self.btn_add_target)
+        line1.addWidget(self.targets_color)
+        line1.addWidget(self.btn_target)
         line1.addWidget(self.btn_clear)
         line1.addWidget(self.btn_exportCSV)
         line1.addStretch(1)
@@ -157,6 +276,26 @@ class ImageDisplay(QWidget):
         self.epsi_spin.setSingleStep(1)
         self.epsi_spin.setValue(10)
         grid.addWidget(self.epsi_spin,5,2)
+
+        self.btn_sweep.setStatusTip("Calcule en une lecture des images les "+
+            "trajectoires pour tous les epsilon (modèle RGB) : changer "+
+            "epsilon met alors à jour les tracés")
+        grid.addWidget(self.btn_sweep,5,3)
+
+        self.btn_roi.setCheckable(True)
+        self.btn_roi.setStatusTip("La prochaine sélection à la souris définit la "+
+            "région de la vidéo à garder (un clic sans glisser : image entière)")
+        grid.addWidget(self.btn_roi,6,1)
+
+        self.downscale_spin.setRange(1,8)
+        self.downscale_spin.setValue(1)
+        self.downscale_spin.setPrefix("réduction x")
+        self.downscale_spin.setStatusTip("Facteur de réduction de la taille des frames")
+        grid.addWidget(self.downscale_spin,6,2)
+
+        self.btn_ingest.setStatusTip("Relit la vidéo recadrée sur la région choisie "+
+            "et réduite")
+        grid.addWidget(self.btn_ingest,7,1,1,2)
         
         infoVBox.addStretch()
 
@@ -206,6 +345,8 @@ class ImageDisplay(QWidget):
         self.btn_traj.clicked.connect(self.extract_trajectoire)
         self.btn_clear.clicked.connect(self.mw.clearPlots)
         self.btn_exportCSV.clicked.connect(self.mw.ExportCSV)
+        self.btn_add_target.clicked.connect(self.add_target)
+        self.btn_target.currentIndexChanged.connect(self.__target_changed)
         self.btn_prev.clicked.connect(self.prev_image)
         self.btn_next.clicked.connect(self.next_image)
         self.btn_first.clicked.connect(self.first_image)
@@ -213,10 +354,18 @@ class ImageDisplay(QWidget):
         self.images_step.valueChanged.connect(self.__step_changed)
         self.images_firstRank.valueChanged.connect(self.__first_rank_changed)
         self.images_lastRank.valueChanged.connect(self.__last_rank_changed)
+        self.btn_ingest.clicked.connect(self.reingest_video)
+        self.btn_sweep.clicked.connect(self.sweep_epsilon)
+        self.epsi_spin.valueChanged.connect(self.__epsilon_changed)
+        self.btn_color.currentIndexChanged.connect(lambda i: self.update_preview())
+        self.btn_algo.currentIndexChanged.connect(self.__algo_changed)
 
     def buttonsState(self, importCSV=False):
 
         self.btn_traj.setEnabled(False)
+        self.btn_sweep.setEnabled(False)
+        self.sweep = None
+        self.picked_RGB, self.target_pix = None, None
         self.picked_color.setText("X")
         self.picked_color.setEnabled(False)
         
@@ -226,6 +375,18 @@ class ImageDisplay(QWidget):
         self.target_color_label.setEnabled(False)
         self.picked_color.setStyleSheet('background-color : rgb(255, 255, 255)')
         
+        self.btn_add_target.setEnabled(False)
+        self.btn_add_target.setStatusTip("Ajoute la couleur choisie aux cibles "+
+            "à extraire ensemble")
+        self.targets_RGB, self.targets_pix = [], []
+        self.targets_color.setText("")
+        self.btn_target.blockSignals(True)
+        self.btn_target.clear()
+        self.btn_target.blockSignals(False)
+        self.btn_target.setEnabled(False)
+        self.btn_target.setStatusTip("Choix de la cible des onglets "+
+            "<Fonction> et <Console>")
+
         self.btn_clear.setEnabled(False)
         self.btn_clear.setStatusTip('Nettoye tous les tracés des onglets'+
             '<trajectoire> et <X(t), Y(t)>')
@@ -237,6 +398,13 @@ class ImageDisplay(QWidget):
         if not importCSV: self.btn_algo.addItems(ImageDisplay.algo_traj)
         self.btn_algo.setEnabled(False)
 
+        if self.btn_color.count() == 0:
+            self.btn_color.addItems(ImageDisplay.color_models)
+        self.btn_color.setEnabled(False)
+        self.btn_color.setStatusTip("Modèle de la couleur de la cible : boîte RGB "+
+            "de demi-largeur epsilon, ou modèle HSV, Lab, Mahalanobis "+
+            "construit sur les pixels sélectionnés")
+
         self.btn_prev.setEnabled(False)
         self.btn_prev.setStatusTip("affiche l'image précédente")
 
@@ -302,6 +470,46 @@ class ImageDisplay(QWidget):
     def __epsilonVisible(self, state):
         self.lbl_epsilon.setVisible(state)
         self.epsi_spin.setVisible(state)
+        self.btn_sweep.setVisible(state)
+
+    def __algo_changed(self, num):
+        # la soustraction du fond n'a pas besoin d'une couleur de cible :
+        algo = self.btn_algo.currentText()
+        self.btn_traj.setEnabled(self.picked_RGB is not None or
+                                 (algo == ImageDisplay.motion_algo and
+                                  self.frame_source is not None))
+        # le balayage d'epsilon ne sert qu'aux algorithmes de couleur :
+        self.btn_sweep.setEnabled(self.picked_RGB is not None and
+                                  algo not in (ImageDisplay.motion_algo,
+                                               ImageDisplay.template_algo))
+        self.update_preview()
+
+    def __epsilon_changed(self, val):
+        self.update_preview()
+        # après un balayage, la trajectoire est recalculée à partir des
+        # statistiques du balayage, sans relire les images ; les algorithmes
+        # 'mouvement' et 'motif' n'utilisent pas epsilon de la même façon et
+        # demanderaient un nouveau suivi de toutes les images :
+        algo = self.btn_algo.currentText()
+        if self.sweep is None or self.picked_RGB is None or \
+           algo in (ImageDisplay.motion_algo, ImageDisplay.template_algo):
+            return
+        first, last, step = self.extraction_range()
+        colors, _ = self.extraction_colors()
+        frame_stats = self.swept_stats(colors, val, range(first, last+1, step))
+        if frame_stats is None: return
+        target_pos = self.positions_from_stats(frame_stats, len(colors),
+                                               range(first, last+1, step), algo)
+        num = self.mw.target_num
+        self.mw.set_targets(self.video_positions(target_pos), colors)
+        if num < len(colors): self.mw.select_target(num)
+        self.update_target_choice()
+        self.mw.replot()
+
+    def __ingestVisible(self, state):
+        self.btn_roi.setVisible(state)
+        self.downscale_spin.setVisible(state)
+        self.btn_ingest.setVisible(state)
 
     def open_video(self):
         '''Lance un sélecteur de fichier pour choisir la vidéo à traiter.'''
@@ -320,9 +528,17 @@ class ImageDisplay(QWidget):
                     QMessageBox.Yes | QMessageBox.No,   # afficher les boutons Yes et No
                     QMessageBox.No)                     # bouton No sélectionné par défaut
                 if rep == QMessageBox.No: return
-            # fichier vidéo à traiter => faire le split des images :
+            else:
+                # nouvelle vidéo : pas de recadrage
+                self.ingest_roi = None
+                self.downscale_spin.setValue(1)
             self.video_path = vp
-            self.extract_images_from_video()
+            if self.mw.flags["streamVideo"]:
+                # lecture directe des frames de la vidéo, sans découpage :
+                self.stream_video()
+            else:
+                # fichier vidéo à traiter => faire le split des images :
+                self.extract_images_from_video()
 
 
     def load_images_from_directory(self):
@@ -337,22 +553,44 @@ class ImageDisplay(QWidget):
             # un répertoire valide a été choisi :
             self.video_path = None
             self.images_dir = dname + "/"
-
-            try:
-                # Lecture du fichier ascii des méta-données
-                with open(self.images_dir + "metaData.txt", "r") as F:
-                    data = F.read()
-                exec('self.dico_video = '+data)
-            except:
-                rep = QMessageBox.critical(
-                    None,             # widget parent de QMessageBox
-                    'Erreur',    # bandeau de la fenêtre
-                    'Pas de fichier de méta-données dans le répertoire'+\
-                    ' <{}>'.format(os.path.basename(dname)),
-                    QMessageBox.Ok)
-                return
-
-
+            self.frame_index = None
+            if os.path.isfile(self.images_dir + "frameIndex.npy"):
+                try:
+                    self.frame_index = np.load(self.images_dir + "frameIndex.npy",
+                                               allow_pickle=False)
+                except (OSError, ValueError):
+                    print("Index des frames illisible dans '{}'".format(dname))
+                if self.frame_index is not None and \
+                   self.frame_index.dtype != frame_index_dtype:
+                    self.frame_index = None
+
+            self.manifest = read_manifest(self.images_dir)
+            if self.manifest is not None:
+                problems = check_manifest(self.images_dir, self.manifest)
+                if problems:
+                    rep = QMessageBox.critical(
+                        None,             # widget parent de QMessageBox
+                        'Erreur',    # bandeau de la fenêtre
+                        '{} fichier(s) manquant(s) ou modifié(s) dans le '\
+                        'répertoire <{}> : {}...'.format(len(problems),
+                                                        os.path.basename(dname),
+                                                        problems[0]),
+                        QMessageBox.Ok)
+                    return
+                self.dico_video = self.manifest["video"]
+            else:
+                try:
+                    # ancien dossier : fichier ascii des méta-données
+                    with open(self.images_dir + "metaData.txt", "r") as F:
+                        self.dico_video = ast.literal_eval(F.read())
+                except (OSError, ValueError, SyntaxError):
+                    rep = QMessageBox.critical(
+                        None,             # widget parent de QMessageBox
+                        'Erreur',    # bandeau de la fenêtre
+                        'Pas de fichier de méta-données dans le répertoire'+\
+                        ' <{}>'.format(os.path.basename(dname)),
+                        QMessageBox.Ok)
+                    return
 
             print("méta données :", self.dico_video)
 
@@ -369,46 +607,167 @@ class ImageDisplay(QWidget):
 
         # Récupérer l'algorithme de calcul du centre de la cible :
         algo = self.btn_algo.currentText()
+        epsilon = self.epsi_spin.value()
+        # algorithmes qui suivent les frames dans l'ordre :
+        sequential = algo in (ImageDisplay.motion_algo, ImageDisplay.template_algo)
+        if algo == ImageDisplay.motion_algo:
+            # une cible, la tache mobile, tracée dans la couleur choisie :
+            RGB = self.picked_RGB if self.picked_RGB is not None else (0, 0, 0)
+            targets_RGB = np.array([RGB])
+            targets = [MotionDetector(RGB=RGB)]
+        elif algo == ImageDisplay.template_algo:
+            # une cible, le motif sélectionné :
+            targets_RGB = np.array([self.picked_RGB])
+            targets = [TemplateTracker(self.target_pix, self.target_corner,
+                                       RGB=self.picked_RGB)]
+        else:
+            # toutes les cibles sont extraites en une seule lecture des images :
+            targets_RGB, patches = self.extraction_colors()
+            targets = self.extraction_targets(targets_RGB, patches, epsilon)
 
         # Définition de la liste dans laquelle on va récupérer les coordonnées
-        # du centre cible pour toutes les images :
+        # du centre de chaque cible pour toutes les images :
         target_pos = []
 
         # Création d'un objet ProgressBar qui va lancer le travail
         # d'extraction de la cible dans les images tout en affichant une
         # barre d'avancement :
         
-        first = self.images_firstRank.value()
-        last  = self.images_lastRank.value()
-        step  = self.images_step.value()
-        
-        last = last - (last - first) % step
-        first_last_step = (first, last, step)
-        pg = ProgressBar(self.images_dir, self)
-        pg.configure_for_target_extraction(self.mw.target_RGB,
-                                           algo,
-                                           self.epsi_spin.value(),
-                                           target_pos,
-                                           first_last_step)
-        ret = pg.exec_() # lance la barre et le travail d'extraction...
-        print("retour de pg.exec_() :",ret)
-
-        if ret != 0:
-            self.mw.target_pos = None
-            return
-
-        target_pos = np.array(target_pos)
-        width, height = self.video_size
-        # l'axe verticale est retourné et decalé:
-        target_pos[1] = height - target_pos[1]
+        first_last_step = self.extraction_range()
+        first, last, step = first_last_step
+        # statistiques des images déjà calculées pour ces cibles : les
+        # centres en sont déduits sans relire les images
+        frame_stats = None
+        if not sequential:
+            frame_stats = self.cached_stats(targets, epsilon,
+                                            range(first, last+1, step))
+        if frame_stats is None and not sequential:
+            frame_stats = self.swept_stats(targets, epsilon,
+                                           range(first, last+1, step))
+        if frame_stats is not None:
+            print("Calcul du centre cible avec l'algorithme '{}' à partir des "
+                  "statistiques des images déjà calculées".format(algo))
+            target_pos = self.positions_from_stats(frame_stats, len(targets),
+                                                   range(first, last+1, step),
+                                                   algo)
+        elif sequential:
+            # le modèle du fond ou le motif suit les frames dans l'ordre : un
+            # seul thread, sans fenêtre prédite ni recherche grossière ; le
+            # centre est le barycentre de la tache ou le centre du motif
+            pg = ProgressBar(self.images_dir or self.video_path, self)
+            pg.configure_for_target_extraction(self.open_frame_source(),
+                                               targets,
+                                               'barycentre',
+                                               epsilon,
+                                               target_pos,
+                                               first_last_step)
+            ret = pg.exec_()
+            print("retour de pg.exec_() :",ret)
+            if ret != 0:
+                self.mw.target_pos = None
+                return
+        else:
+            frame_stats = {}
+            # recherche de la cible autour de la position prédite :
+            predict = self.mw.flags["predictiveWindow"]
+            # recherche dans l'image sous-échantillonnée puis en pleine résolution :
+            pyramid = None
+            if self.mw.pyramid_factor > 1:
+                pyramid = (self.mw.pyramid_factor, self.mw.pyramid_tolerance)
+            # la source d'images est propre au thread d'extraction :
+            pg = ProgressBar(self.images_dir or self.video_path, self)
+            if self.images_dir is None and self.mw.flags["parallelTracking"]:
+                # frames décodées dans la mémoire partagée par un processus et
+                # traitées par les autres :
+                roi_scale = (self.dico_video.get('roi', None),
+                             self.dico_video.get('downscale', 1))
+                pg.configure_for_parallel_target_extraction(self.video_path,
+                                                            roi_scale,
+                                                            targets,
+                                                            algo,
+                                                            epsilon,
+                                                            target_pos,
+                                                            first_last_step,
+                                                            pyramid=pyramid,
+                                                            frame_stats=frame_stats)
+            elif self.mw.flags["parallelTracking"]:
+                # lots d'images traités par un pool de processus :
+                pg.configure_for_batch_target_extraction(self.open_frame_source(),
+                                                         targets,
+                                                         algo,
+                                                         epsilon,
+                                                         target_pos,
+                                                         first_last_step,
+                                                         predict=predict,
+                                                         pyramid=pyramid,
+                                                         frame_stats=frame_stats)
+            else:
+                pg.configure_for_target_extraction(self.open_frame_source(),
+                                                   targets,
+                                                   algo,
+                                                   epsilon,
+                                                   target_pos,
+                                                   first_last_step,
+                                                   predict,
+                                                   pyramid,
+                                                   frame_stats)
+            ret = pg.exec_() # lance la barre et le travail d'extraction...
+            print("retour de pg.exec_() :",ret)
+
+            if ret != 0:
+                self.mw.target_pos = None
+                return
+            # seules les statistiques de toute l'image sont gardées : celles
+            # de la fenêtre prédite ou de la recherche grossière sont
+            # approchées. Le thread dit si elles ont toutes été calculées
+            # sur toute l'image (la mémoire partagée ignore la fenêtre
+            # prédite, une recherche grossière peut être reprise sur toute
+            # l'image) :
+            if pg.full_frame_stats():
+                self.save_stats(targets, epsilon, frame_stats)
+
+        target_pos = self.video_positions(target_pos)
         self.scale_XY()
 
-        self.mw.target_pos = target_pos
+        self.mw.set_targets(target_pos, targets_RGB)
+        self.update_target_choice()
         self.display_plots()
         
         # remettre le bouton extraire_trajectoire disabled:
         self.btn_exportCSV.setEnabled(True)
 
+    def positions_from_stats(self, frame_stats, nb_targets, indices, algo):
+        '''Positions (cf. TargetsPositions.fill) des <nb_targets> cibles dans
+           les frames <indices>, déduites des statistiques <frame_stats>
+           (rang -> statistiques des cibles) avec l'algorithme <algo>.'''
+        target_pos = []
+        positions = TargetsPositions(nb_targets)
+        for index in indices:
+            if not positions.add(index, centers_from_stats(frame_stats[index], algo)):
+                print("erreur extraction cible, image {}...".format(index))
+        positions.fill(target_pos)
+        return target_pos
+
+    def video_positions(self, target_pos):
+        '''Tableau (ncibles, 3, nimages) des positions <target_pos> dans le
+           repère de la vidéo : n° des frames de la vidéo, coordonnées dans
+           la frame complète, axe vertical vers le haut.'''
+        target_pos = np.array(target_pos, dtype=float)
+        # n° des frames dans la vidéo quand le découpage n'a gardé que les
+        # frames first, first+step... :
+        split_first, _, split_step = self.dico_video.get('range', (1, None, 1))
+        target_pos[:,2] = split_first + (target_pos[:,2]-1)*split_step
+        # coordonnées dans la frame complète quand la vidéo a été recadrée et
+        # réduite (centre des blocs de f x f pixels) :
+        x0, y0 = (self.dico_video.get('roi', None) or (0, 0, 0, 0))[:2]
+        factor = self.dico_video.get('downscale', 1)
+        target_pos[:,0] = x0 + target_pos[:,0]*factor + (factor-1)/2
+        target_pos[:,1] = y0 + target_pos[:,1]*factor + (factor-1)/2
+        width, height = self.video_size
+        # l'axe verticale est retourné et decalé:
+        target_pos[:,1] = height - target_pos[:,1]
+        return target_pos
+
     def display_plots(self):
         self.mw.clearPlots()
         
@@ -436,8 +795,39 @@ class ImageDisplay(QWidget):
         # name of the video file without path and suffix:
         videoname = os.path.basename(self.video_path)[:-4]
 
-        # directory where to put extracted iamges:
-        self.images_dir = self.mw.image_dir + videoname + "/"
+        video = cv2.VideoCapture(self.video_path)
+        self.read_video_meta_data(video)
+
+        # frames to split: all the frames, or the range chosen up front
+        first_last_step = (1, None, 1)
+        if self.mw.flags["splitRange"]:
+            dialog = SplitRangeDialog(self.video_nframes, self)
+            if dialog.exec_() != QDialog.Accepted: return
+            first_last_step = dialog.first_last_step()
+            if first_last_step[1] == self.video_nframes:
+                # jusqu'à la fin : le nombre de frames n'est qu'une estimation
+                first_last_step = (first_last_step[0], None, first_last_step[2])
+        if nb_frames_in_range(self.video_nframes, *first_last_step) == 0:
+            QMessageBox.warning(self, "Découpage",
+                                "Aucune frame à découper entre les frames {} "
+                                "et {}".format(*first_last_step[:2]))
+            video.release()
+            return
+
+        # directory where to put extracted iamges, named after the key of the
+        # video so that 2 videos with the same name don't share their images:
+        roi_scale = (self.dico_video['roi'], self.dico_video['downscale'])
+        key = video_key(self.video_path, (first_last_step, roi_scale))
+        self.images_dir = os.path.join(self.mw.image_dir,
+                                       "{}-{}".format(videoname, key[:12])) + "/"
+
+        if self.load_cached_split(key):
+            # vidéo inchangée déjà découpée : pas de nouveau découpage
+            print("Images de '{}' lues dans le cache '{}'"\
+                  .format(os.path.basename(self.video_path), self.images_dir))
+            video.release()
+            self.update_images()
+            return
 
         if os.path.isdir(self.images_dir) :
             print("Effacement de tous les fichiers de '{}'"\
@@ -447,45 +837,182 @@ class ImageDisplay(QWidget):
         else :
             os.mkdir(self.images_dir)
 
-        video = cv2.VideoCapture(self.video_path)
-        
-        self.dico_video['nframes']   = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.dico_video['size']      = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                                        int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))    
-        self.dico_video['fps']       = int(video.get(cv2.CAP_PROP_FPS))
-        self.dico_video['duration']  = video.get(cv2.CAP_PROP_FRAME_COUNT)/video.get(cv2.CAP_PROP_FPS)
-        self.dico_video['videoname'] = os.path.basename(self.video_path)
-                                            
-        self.parse_meta_data()
-        self.dico_video["videoname"] = videoname+".mp4"
-        self.setTextInfoVideoGrid()
+        self.dico_video['key'] = key
+        self.dico_video['range'] = first_last_step
+        self.manifest = None
 
         # Création d'un objet ProgressBar qui va lancer le travail
         # d'extraction des images tout en affichant une barre d'avancement :
         pg = ProgressBar(self.images_dir, self)
-        pg.configure_for_video_extraction(video, self.mw.image_fmt)
+        if self.mw.flags["frameCube"]:
+            # toutes les frames dans un seul fichier en mémoire mappée :
+            # nombre exact de frames donné par l'index s'il existe :
+            nbVideoFrames = None if self.frame_index is None else len(self.frame_index)
+            pg.configure_for_cube_extraction(video, first_last_step, roi_scale,
+                                             nbVideoFrames)
+        elif self.mw.flags["parallelSplit"]:
+            # découpage par segments, un processus par coeur :
+            video.release()
+            pg.configure_for_parallel_video_extraction(self.video_path,
+                                                       self.mw.image_fmt,
+                                                       os.cpu_count(),
+                                                       self.mw.png_compression,
+                                                       first_last_step,
+                                                       roi_scale)
+        else:
+            pg.configure_for_video_extraction(video, self.mw.image_fmt,
+                                              self.mw.png_compression,
+                                              first_last_step,
+                                              roi_scale)
         ret = pg.exec_()
         print("retour de pg.exec_() :", ret)
-        if ret != 0: return
+        # exec_() ne renvoie qu'à la fin du thread (OK) ou après son arrêt
+        # (Cancel, -1) : seul le résultat du thread compte.
+        if ret == -1 or not pg.thread_complete():
+            print("Découpage de '{}' incomplet : pas de manifeste"\
+                  .format(self.images_dir))
+            return
+
+        # écriture du manifeste (méta-data et liste des fichiers), seulement
+        # à la fin d'un découpage complet : il valide le cache du découpage.
+        if self.frame_index is not None:
+            np.save(self.images_dir+"frameIndex.npy", self.frame_index)
+        self.manifest = write_manifest(self.images_dir, self.dico_video)
 
         # MAJ de la liste des fichiers images :
         self.update_images()
 
-        # écriture des méta-data dans le fichier 'nom_video'.info
-        with open(self.mw.image_dir+videoname+"/metaData.txt", "w") as F:
-            F.write(str(self.dico_video))
+    def load_cached_split(self, key):
+        '''Renvoie True si le dossier des images contient déjà le découpage
+           complet de la vidéo de clé <key>, dont on charge le manifeste (cf.
+           check_manifest : les images sont vérifiées quand elles sont lues).'''
+        manifest = read_manifest(self.images_dir)
+        if manifest is None or manifest["video"].get('key') != key: return False
+        problems = check_manifest(self.images_dir, manifest)
+        if problems:
+            print("Cache '{}' incomplet : {} fichier(s) manquant(s) ou modifié(s)"\
+                  .format(self.images_dir, len(problems)))
+            return False
+
+        self.manifest   = manifest
+        self.dico_video = manifest["video"]
+        self.parse_meta_data()
+        self.setTextInfoVideoGrid()
+        return True
+
+    def stream_video(self):
+        '''Prépare le traitement direct de la vidéo : les frames seront lues
+           dans le fichier vidéo pour l'affichage comme pour l'extraction de
+           la trajectoire, sans écrire de fichiers images.'''
+        self.images_dir = None
+        self.manifest   = None
+
+        video = cv2.VideoCapture(self.video_path)
+        self.read_video_meta_data(video)
+        video.release()
+
+        # MAJ de l'application avec les frames de la vidéo :
+        self.update_images()
+
+    def reingest_video(self):
+        '''Relit la vidéo courante (découpage ou lecture directe) en la
+           recadrant sur la région choisie et en la réduisant.'''
+        if self.video_path is None: return
+        if self.images_dir is None:
+            self.stream_video()
+        else:
+            self.extract_images_from_video()
+
+    def set_ingest_roi(self, selection):
+        '''Définit la région de la vidéo à garder à partir de la sélection
+           <selection> faite sur l'image affichée, éventuellement déjà
+           recadrée et réduite.'''
+        self.btn_roi.setChecked(False)
+        if selection.width() < 2 or selection.height() < 2:
+            self.ingest_roi = None
+            self.mw.statusBar().showMessage("ROI : image entière")
+            return
+        x0, y0 = (self.dico_video.get('roi', None) or (0, 0, 0, 0))[:2]
+        factor = self.dico_video.get('downscale', 1)
+        width, height = self.video_size
+        x = min(x0 + selection.x()*factor, width-1)
+        y = min(y0 + selection.y()*factor, height-1)
+        w = min(selection.width()*factor, width-x)
+        h = min(selection.height()*factor, height-y)
+        self.ingest_roi = (x, y, w, h)
+        self.mw.statusBar().showMessage("ROI : {}".format(self.ingest_roi))
+
+    def read_video_meta_data(self, video):
+        '''Remplit le dictionnaire des méta-données à partir de l'index des
+           frames de la vidéo et de l'objet cv2.VideoCapture <video> puis met à
+           jour l'affichage. CAP_PROP_FRAME_COUNT et CAP_PROP_FPS ne sont que
+           des estimations : le nombre de frames, le FPS moyen et la durée
+           viennent des timestamps de l'index s'il est complet.'''
+        self.frame_index = load_frame_index(self.video_path)
+        nframes = len(self.frame_index)
+        pts = self.frame_index['pts']
+        if nframes > 1 and pts[-1] > pts[0]:
+            fps = 1000*(nframes-1)/(pts[-1]-pts[0])
+        else:
+            self.frame_index = None
+            nframes = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = video.get(cv2.CAP_PROP_FPS)
+
+        self.dico_video = {}
+        self.dico_video['nframes']   = nframes
+        self.dico_video['size']      = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                        int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))    
+        self.dico_video['fps']       = round(fps, 3)
+        self.dico_video['duration']  = nframes/fps
+        self.dico_video['videoname'] = os.path.basename(self.video_path)
+        self.dico_video['roi']       = self.ingest_roi
+        self.dico_video['downscale'] = self.downscale_spin.value()
+                                            
+        self.parse_meta_data()
+        self.setTextInfoVideoGrid()
+
+    def open_frame_source(self):
+        '''Renvoie une nouvelle source d'images pour les images courantes :
+           frames de la vidéo si on la traite directement, sinon fichier des
+           frames en mémoire mappée ou fichiers PNG du dossier des images
+           (None s'il n'y a rien à lire).'''
+        if self.images_dir is not None and FrameCube.exists(self.images_dir):
+            return FrameCube(self.images_dir)
+        elif self.images_dir is not None:
+            images_list, images_sizes = None, None
+            if self.manifest is not None and self.manifest["storage"] == "png":
+                images_list  = [entry["name"] for entry in self.manifest["files"]]
+                images_sizes = [entry["size"] for entry in self.manifest["files"]]
+            return ImagesDirectory(self.images_dir, self.mw.image_fmt, images_list,
+                                   images_sizes)
+        elif self.video_path is not None:
+            return VideoStream(self.video_path, self.dico_video.get('roi', None),
+                               self.dico_video.get('downscale', 1),
+                               self.frame_index)
+        return None
+
+    def frame_times(self, I):
+        '''Instants [s] des frames de n° <I> : timestamps de l'index des frames
+           s'il existe, sinon I/fps (None si le FPS n'est pas connu).'''
+        I = np.asarray(I, dtype=int)
+        if self.frame_index is not None and I.size and I.max() <= len(self.frame_index):
+            return self.frame_index['pts'][I-1]/1000
+        if self.video_FPS is None: return None
+        return I/self.video_FPS
 
     def computeTargetColor(self, draw_selection=False):
         col_min,row_min,col_max,row_max = self.selection.getCoords()
         print(f"Pixels selectionnés : lignes [{row_min},{row_max}] colonnes [{col_min},{col_max}]")
 
-        tab = imread(self.img_path)
+        tab = self.frame_source.read(self.img_idx)
         self.target_pix = tab[row_min:row_max+1, col_min:col_max+1, :]
+        self.target_corner = (col_min, row_min)
         R = round(self.target_pix[:,:,0].mean())
         G = round(self.target_pix[:,:,1].mean())
         B = round(self.target_pix[:,:,2].mean())
         self.mw.target_RGB = np.array([R, G, B], dtype=int)
-        print("RGB sélection dans <{}> :".format(os.path.basename(self.img_path)),
+        self.picked_RGB = self.mw.target_RGB
+        print("RGB sélection dans <{}> :".format(self.img_path),
               self.mw.target_RGB)
 
         draw_selection = self.mw.flags["drawTargetSelection"]
@@ -503,18 +1030,153 @@ class ImageDisplay(QWidget):
             # draw rectangle on painter
             self.selectTargetRect.begin(self)
             self.selectTargetRect.setPen(self.penRectangle)
-            self.selectTargetRect.drawRect(col_min,row_min,
-                                          col_max-col_min,row_max-row_min)
+            f = self.display_factor # l'image affichée est peut-être un proxy
+            self.selectTargetRect.drawRect(col_min//f, row_min//f,
+                                          (col_max-col_min)//f,
+                                          (row_max-row_min)//f)
             self.selectTargetRect.setOpacity(0.1)
             self.selectTargetRect.end()
             #self.show_image()
+        else:
+            self.update_preview()
 
         self.btn_traj.setEnabled(True)
+        self.btn_sweep.setEnabled(self.btn_algo.currentText() not in
+                                  (ImageDisplay.motion_algo,
+                                   ImageDisplay.template_algo))
         self.btn_algo.setEnabled(True)
+        self.btn_color.setEnabled(True)
+        self.btn_add_target.setEnabled(True)
         self.btn_clear.setEnabled(True)
         self.target_color_label.setEnabled(True)
         self.picked_color.setStyleSheet('background-color : rgb({},{},{})'.format(R, G, B))
 
+    def add_target(self):
+        '''Ajoute la couleur choisie aux couleurs des cibles à extraire.'''
+        if self.picked_RGB is None: return
+        if any((self.picked_RGB == RGB).all() for RGB in self.targets_RGB):
+            return
+        self.targets_RGB.append(self.picked_RGB)
+        self.targets_pix.append(self.target_pix)
+        self.targets_color.setText("".join(
+            "<span style='color:rgb({},{},{})'>&#9632;</span>".format(*RGB)
+            for RGB in self.targets_RGB))
+
+    def extraction_range(self):
+        '''(first, last, step) des images à traiter, last étant ramené sur
+           le pas.'''
+        first = self.images_firstRank.value()
+        last  = self.images_lastRank.value()
+        step  = self.images_step.value()
+        return first, last - (last - first) % step, step
+
+    def extraction_colors(self):
+        '''Couleurs (tableau (ncibles, 3)) et pixels sélectionnés des cibles
+           à extraire : les cibles ajoutées et la couleur choisie.'''
+        colors, patches = list(self.targets_RGB), list(self.targets_pix)
+        if not any((self.picked_RGB == RGB).all() for RGB in colors):
+            colors.append(self.picked_RGB)
+            patches.append(self.target_pix)
+        return np.array(colors), patches
+
+    def extraction_targets(self, colors, patches, epsilon):
+        '''Cibles passées à l'extraction : les couleurs pour le modèle 'RGB',
+           sinon un ColorClassifier par cible, compilé une fois ici.'''
+        model = self.btn_color.currentText()
+        if model == "RGB": return colors
+        return [ColorClassifier(patch, model, epsilon) for patch in patches]
+
+    def stats_path(self, target, epsilon):
+        '''Fichier des statistiques des frames pour la cible <target> (couleur
+           ou ColorClassifier) et <epsilon> : dans le dossier des images
+           découpées, ou à côté de la vidéo lue directement.'''
+        if self.images_dir is not None:
+            return self.images_dir + stats_prefix + stats_key(target, epsilon) + ".npy"
+        source = "{}|{}|{}".format(self.dico_video.get('roi', None),
+                                   self.dico_video.get('downscale', 1),
+                                   os.path.getmtime(self.video_path))
+        return "{}.{}{}.npy".format(self.video_path, stats_prefix,
+                                    stats_key(target, epsilon, source))
+
+    def cached_stats(self, targets, epsilon, indices):
+        '''Dictionnaire rang -> statistiques des cibles <targets> pour les
+           frames <indices>, lu dans les fichiers des statistiques, ou None
+           s'il manque une frame pour une des cibles.'''
+        tabs = [load_frame_stats(self.stats_path(target, epsilon))
+                for target in targets]
+        if not all(index in tab for tab in tabs for index in indices):
+            return None
+        return {index: [tab[index] for tab in tabs] for index in indices}
+
+    def save_stats(self, targets, epsilon, frame_stats):
+        '''Ajoute les statistiques <frame_stats> (rang -> statistiques des
+           cibles) aux fichiers des statistiques de chaque cible.'''
+        for num, target in enumerate(targets):
+            path = self.stats_path(target, epsilon)
+            try:
+                save_frame_stats(path, {index: stats[num]
+                                        for index, stats in frame_stats.items()})
+            except OSError:
+                print("Statistiques des images non écrites dans '{}'".format(path))
+
+    def sweep_epsilon(self):
+        '''Balayage d'epsilon : statistiques des cibles pour tous les epsilon
+           de 0 au maximum de epsi_spin, en une lecture des images, puis
+           trajectoire pour l'epsilon choisi. Le balayage n'est gardé que si
+           toutes les images ont été balayées.'''
+        if self.btn_algo.currentText() in (ImageDisplay.motion_algo,
+                                           ImageDisplay.template_algo):
+            return
+        if self.btn_color.currentText() != "RGB":
+            QMessageBox.warning(self, "Balayage epsilon",
+                                "Le balayage d'epsilon n'est possible qu'avec "
+                                "le modèle de couleur RGB")
+            return
+        targets_RGB, _ = self.extraction_colors()
+
+        sweep = {}
+        pg = ProgressBar(self.images_dir or self.video_path, self)
+        pg.configure_for_epsilon_sweep(self.open_frame_source(),
+                                       targets_RGB,
+                                       self.epsi_spin.maximum(),
+                                       self.extraction_range(),
+                                       sweep)
+        ret = pg.exec_()
+        print("retour de pg.exec_() :",ret)
+        if ret != 0 or not pg.thread_complete():
+            print("Balayage d'epsilon incomplet : non gardé")
+            return
+        self.sweep = (targets_RGB, sweep)
+        self.extract_trajectoire()
+
+    def swept_stats(self, targets, epsilon, indices):
+        '''Dictionnaire rang -> statistiques des cibles <targets> pour les
+           frames <indices> tiré du dernier balayage d'epsilon, ou None si
+           le balayage ne couvre pas ces cibles et ces frames.'''
+        if self.sweep is None or self.btn_color.currentText() != "RGB":
+            return None
+        colors, sweep = self.sweep
+        if np.shape(targets) != colors.shape or (targets != colors).any():
+            return None
+        if not all(index in sweep for index in indices): return None
+        return {index: [sweep_stats(tab, epsilon) for tab in sweep[index]]
+                for index in indices}
+
+    def update_target_choice(self):
+        '''Remplit la liste de choix de la cible courante.'''
+        nb_targets = len(self.mw.targets())
+        self.btn_target.blockSignals(True)
+        self.btn_target.clear()
+        self.btn_target.addItems(["cible {}".format(k+1) for k in range(nb_targets)])
+        self.btn_target.setCurrentIndex(self.mw.target_num)
+        self.btn_target.blockSignals(False)
+        self.btn_target.setEnabled(nb_targets > 1)
+
+    def __target_changed(self, num):
+        if num < 0 or self.mw.targets_pos is None: return
+        self.mw.select_target(num)
+        self.display_plots()
+
     @property
     def img_idx(self): return self.__img_idx
 
@@ -531,7 +1193,11 @@ class ImageDisplay(QWidget):
            - met à jour l'état de certains boutons
            - fait afficher la première image et un message d'information.'''
 
-        if self.images_dir is None :
+        self.stop_proxies()
+        if self.frame_source is not None: self.frame_source.close()
+        self.frame_source = self.open_frame_source()
+
+        if self.frame_source is None :
             self.__img_idx = None
             #self.btn_prev.setEnabled(False)
             self.btn_prev.setStatusTip("")
@@ -546,11 +1212,7 @@ class ImageDisplay(QWidget):
             self.mw.clearPlots()
             self.mw.twoPlots_VxVy.reset()
             
-            # liste des noms des fichiers image pour avoir leur nombre :
-            file_names = [ f for f in os.listdir(self.images_dir) \
-                           if f.endswith('.png')]
-            file_names.sort()
-            self.nb_img = len(file_names)
+            self.nb_img = self.frame_source.nb_frames
 
               # Update spinBox:
             self.images_step.setEnabled(True)
@@ -578,8 +1240,13 @@ class ImageDisplay(QWidget):
                 self.img_idx+self.images_step.value()))
           
             self.show_image()
+            self.start_proxies()
+            # l'algorithme 'mouvement' se passe de la couleur de la cible :
+            self.btn_algo.setEnabled(True)
+            self.__algo_changed(self.btn_algo.currentIndex())
             self.scaleInfoVisible(True)
             self.__epsilonVisible(True)
+            self.__ingestVisible(self.video_path is not None)
             self.mw.tabs.setCurrentWidget(self)
 
             self.scale_mm.clear()
@@ -603,16 +1270,132 @@ class ImageDisplay(QWidget):
                     QMessageBox.Ok)
                 
 
+    def start_proxies(self):
+        '''Lance le calcul en tâche de fond des proxies des frames quand
+           l'image affichée est plus large que <proxy_width>.'''
+        self.proxies = {}
+        width = self.img_lbl.pixmap().width()
+        self.proxy_factor = -(-width//ImageDisplay.proxy_width)
+        if self.proxy_factor <= 1: return
+        self.__proxy_thread = ProxyFramesThread(self.open_frame_source(),
+                                                self.proxy_factor,
+                                                self.proxies)
+        self.__proxy_thread.finished.connect(
+            lambda: print("{} proxies réduits {} fois".format(len(self.proxies),
+                                                                self.proxy_factor)))
+        self.__proxy_thread.start()
+
+    def stop_proxies(self):
+        '''Arrête le calcul des proxies s'il est en cours.'''
+        if self.__proxy_thread is not None:
+            self.__proxy_thread.requestInterruption()
+            self.__proxy_thread.wait()
+            self.__proxy_thread = None
+
     def show_image(self):
-        '''Affiche l'image dont le numéro est donné par l'attribut 'img_idx'.'''
+        '''Affiche l'image dont le numéro est donné par l'attribut 'img_idx',
+           avec son proxy s'il est prêt.'''
+        factor = 1
         if self.img_idx is None :
             self.img_path = ''
+            pixmap = QPixmap()
+        elif self.img_idx in self.proxies :
+            # version réduite de l'image, suffisante pour la navigation :
+            self.img_path = self.frame_source.path(self.img_idx) or \
+                            "frame {}".format(self.img_idx)
+            pixmap = QPixmap()
+            pixmap.loadFromData(self.proxies[self.img_idx], "JPG")
+            factor = self.proxy_factor
+        elif self.frame_source.path(self.img_idx) is not None :
+            self.img_path = self.frame_source.path(self.img_idx)
+            pixmap = QPixmap(self.img_path)
         else :
-            self.img_path = self.images_dir+self.mw.image_fmt.format(self.img_idx)
-        pixmap = QPixmap(self.img_path)
-        self.img_lbl.setPixmap(pixmap)
+            # frame lue directement dans la vidéo ou dans le fichier .npy :
+            self.img_path = "frame {}".format(self.img_idx)
+            tab = self.frame_source.read(self.img_idx)
+            self.__last_frame = (self.frame_source, self.img_idx, tab)
+            height, width, _ = tab.shape
+            image = QImage(tab.data, width, height, 3*width, QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(image)
+        self.display_factor = factor
+        self.__pixmap = pixmap
+        self.update_preview()
         self.img_lbl.setStatusTip(os.path.basename(self.img_path))
 
+    def preview_frame(self):
+        '''Frame affichée sous-échantillonnée (un pixel sur f dans chaque
+           direction, sans mélange des couleurs, cf. subsample) à au plus
+           <proxy_width> pixels de large, et le facteur f. Elle est tirée de
+           la frame décodée en pleine résolution (jamais du proxy JPEG, dont
+           les couleurs sont mélangées), la dernière frame lue étant
+           réutilisée, et gardée tant que l'image affichée ne change pas.'''
+        key = (self.frame_source, self.img_idx)
+        if self.__preview_frame is None or self.__preview_frame[:2] != key:
+            if self.__last_frame is None or self.__last_frame[:2] != key:
+                self.__last_frame = (*key, self.frame_source.read(self.img_idx))
+            tab = self.__last_frame[2]
+            f = max(1, -(-tab.shape[1]//ImageDisplay.proxy_width))
+            self.__preview_frame = (*key, subsample(tab, f), f)
+        return self.__preview_frame[2:]
+
+    def preview_targets(self, epsilon):
+        '''Cibles de l'aperçu du masque (cf. extraction_targets), les
+           ColorClassifier n'étant compilés qu'une fois pour une sélection,
+           un modèle et un epsilon.'''
+        colors, patches = self.extraction_colors()
+        key = (self.btn_color.currentText(), epsilon, colors.tobytes(),
+               tuple(id(patch) for patch in patches))
+        if self.__preview_targets is None or self.__preview_targets[0] != key:
+            self.__preview_targets = (key, self.extraction_targets(colors, patches,
+                                                                  epsilon))
+        return self.__preview_targets[1]
+
+    def update_preview(self):
+        '''Affiche l'image courante avec, si l'option est choisie et qu'une
+           couleur de cible a été choisie, l'aperçu des pixels des cibles et
+           de leurs centres, calculés sur la frame sous-échantillonnée (cf.
+           preview_frame).'''
+        pixmap = self.__pixmap
+        if pixmap is None: return
+        if not self.mw.flags["maskPreview"] or self.picked_RGB is None or \
+           self.img_idx is None or pixmap.isNull() or \
+           self.btn_algo.currentText() in (ImageDisplay.motion_algo,
+                                           ImageDisplay.template_algo):
+            self.img_lbl.setPixmap(pixmap)
+            return
+
+        small, f = self.preview_frame()
+        epsilon = self.epsi_spin.value()
+        algo = self.btn_algo.currentText()
+        mask = np.zeros(small.shape[:2], dtype=np.uint8)
+        centers = []
+        for target in self.preview_targets(epsilon):
+            pixels = target_mask(small, target, epsilon)
+            mask |= pixels
+            centers.append(center_from_stats(mask_stats(pixels), algo))
+
+        height, width = mask.shape
+        overlay = np.zeros((height, width, 4), dtype=np.uint8)
+        overlay[mask > 0] = ImageDisplay.preview_RGBA
+        image = QImage(overlay.data, width, height, 4*width, QImage.Format_RGBA8888)
+        # l'image affichée est peut-être un proxy réduit d'un autre facteur :
+        scale = f/self.display_factor
+        preview = QPixmap(pixmap)
+        painter = QPainter(preview)
+        painter.drawImage(QRectF(0, 0, width*scale, height*scale), image)
+        pen = QPen(QColor(*ImageDisplay.preview_RGBA[:3]))
+        pen.setWidth(2)
+        painter.setPen(pen)
+        for center in centers:
+            if center is None: continue
+            x, y = center[0]*scale, center[1]*scale
+            painter.drawLine(int(x-10), int(y), int(x+10), int(y))
+            painter.drawLine(int(x), int(y-10), int(x), int(y+10))
+        painter.end()
+        self.img_lbl.setPixmap(preview)
+        self.mw.statusBar().showMessage("Aperçu : {} pixels de la cible "
+            "(frame réduite {}x), epsilon {}".format(int((mask > 0).sum()), f, epsilon))
+
     def first_image(self) :
         if self.img_idx == None : return
         self.img_idx = self.images_firstRank.value()
@@ -689,9 +1472,17 @@ class ImageDisplay(QWidget):
             self.pt2 = event.pos()
             print("Coord. pt2 image :", self.pt2)
             self.rubberBand.hide()
-            self.selection = QRect(self.pt1, self.pt2).normalized()
+            selection = QRect(self.pt1, self.pt2).normalized()
+            # coordonnées dans l'image en pleine résolution si l'image
+            # affichée est un proxy :
+            f = self.display_factor
+            self.selection = QRect(selection.x()*f, selection.y()*f,
+                                   selection.width()*f, selection.height()*f)
             print(self.selection)
-            self.computeTargetColor()
+            if self.btn_roi.isChecked():
+                self.set_ingest_roi(self.selection)
+            else:
+                self.computeTargetColor()
 
     def scale_XY(self):
 
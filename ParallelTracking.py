@@ -0,0 +1,269 @@
+#
+# version 1.0 -- 2026-10-18 --
+#   multi-process target extraction: a decoder process fills a ring of frame
+#   slots in shared memory, the slots are processed by tracking worker
+#   processes without pickling the frames.
+#   add track_batches: the frames of any frame source are tracked by a pool of
+#   processes, in batches of consecutive frames, the results are put back in
+#   frame order.
+#   several targets of different colors are tracked with one read of each frame.
+#   the targets can be searched coarse-to-fine (cf. target_center_pyramid).
+#   the workers return the statistics of the masks instead of the centers.
+#   the coarse-to-fine search of the ring workers is checked against the
+#   full-frame search (cf. PyramidSearch), the checks are counted.
+#
+
+import os, sys, time
+import multiprocessing
+from multiprocessing import shared_memory
+from queue import Empty
+
+import cv2
+import numpy as np
+
+from FrameSource import read_frames, ingest_size, VideoStream
+from TargetDetection import (target_center, targets_stats, centers_from_stats,
+                             target_list, FrameTracker, PyramidSearch)
+
+def attach_shared_memory(name):
+    '''Ouvre dans un processus fils le bloc de mémoire partagée <name> créé par
+       le processus principal, qui est seul à le détruire. Les processus
+       "spawn" partagent le resource_tracker du processus principal : le bloc
+       y est déjà enregistré.'''
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python >= 3.13
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def decode_to_ring(video_path, first_last_step, roi_scale,
+                   shm_name, shape, free_slots, ready_slots, nb_workers):
+    '''Processus de décodage : chaque frame RGB est écrite dans un slot libre
+       de l'anneau en mémoire partagée, puis le couple (slot, n° frame) est
+       mis dans <ready_slots>. Un None par worker signale la fin.'''
+    shm = attach_shared_memory(shm_name)
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    video = cv2.VideoCapture(video_path)
+    for num, frame in read_frames(video, *first_last_step, *roi_scale):
+        slot = free_slots.get()
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=ring[slot])
+        ready_slots.put((slot, num))
+    video.release()
+    for _ in range(nb_workers): ready_slots.put(None)
+    del ring
+    shm.close()
+
+def track_ring_slots(shm_name, shape, free_slots, ready_slots, results,
+                     targets_RGB, epsilon, pyramid=None, algo='barycentre'):
+    '''Processus de suivi : calcule les statistiques des cibles dans les
+       slots prêts, libère les slots et renvoie les couples (n° frame,
+       statistiques) dans <results>. Le couple (None, compteurs des
+       recherches à basse résolution) signale la fin du processus.'''
+    shm = attach_shared_memory(shm_name)
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    counters = {}
+    search = None if pyramid is None else PyramidSearch(pyramid, algo, counters)
+    while True:
+        item = ready_slots.get()
+        if item is None: break
+        slot, num = item
+        stats = targets_stats(ring[slot], targets_RGB, epsilon, search, num)
+        free_slots.put(slot)
+        results.put((num, stats))
+    results.put((None, counters))
+    del ring
+    shm.close()
+
+def track_video(video_path, targets_RGB, epsilon,
+                first_last_step=(1, None, 1), roi_scale=(None, 1),
+                nb_workers=None, pyramid=None, algo='barycentre', counters=None):
+    '''Générateur des couples (n° frame, liste des statistiques des cibles
+       <targets_RGB> (cf. target_list et mask_stats)), dans l'ordre des
+       frames <first>, <first>+step... de la vidéo.
+       Un processus décode la vidéo dans un anneau de slots en mémoire
+       partagée, <nb_workers> processus (par défaut un par coeur restant)
+       calculent les statistiques ; les résultats sont remis dans l'ordre.
+       Avec <pyramid> = (facteur, tolérance), les cibles sont cherchées
+       d'abord à basse résolution par chaque processus (cf. PyramidSearch,
+       les vérifications sur toute l'image utilisant l'algorithme <algo>) ;
+       les compteurs des processus sont ajoutés à ceux de <counters>.'''
+    nb_workers = nb_workers or max(1, os.cpu_count()-1)
+    targets_RGB = target_list(targets_RGB)
+
+    video = cv2.VideoCapture(video_path)
+    width, height = ingest_size(int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                *roi_scale)
+    video.release()
+
+    # 2 slots par worker : un en calcul, un prêt à être pris
+    nb_slots = 2*nb_workers + 2
+    shape = (nb_slots, height, width, 3)
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+
+    context = multiprocessing.get_context("spawn")
+    free_slots, ready_slots, results = context.Queue(), context.Queue(), context.Queue()
+    for slot in range(nb_slots): free_slots.put(slot)
+
+    processes = [context.Process(target=decode_to_ring,
+                                 args=(video_path, first_last_step, roi_scale,
+                                       shm.name, shape, free_slots, ready_slots,
+                                       nb_workers))]
+    for _ in range(nb_workers):
+        processes.append(context.Process(target=track_ring_slots,
+                                         args=(shm.name, shape, free_slots,
+                                               ready_slots, results,
+                                               targets_RGB, epsilon, pyramid,
+                                               algo)))
+    for process in processes: process.start()
+
+    completed = False
+    try:
+        first, _, step = first_last_step
+        pending, next_num, nb_done = {}, first, 0
+        while nb_done < nb_workers:
+            try:
+                item = results.get(timeout=0.5)
+            except Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise Exception("arrêt anormal des processus de suivi")
+                continue
+            num, stats = item
+            if num is None:
+                nb_done += 1
+                if counters is not None:
+                    for key, value in stats.items():
+                        counters[key] = counters.get(key, 0) + value
+                continue
+            pending[num] = stats
+            # les résultats arrivent dans le désordre :
+            while next_num in pending:
+                yield next_num, pending.pop(next_num)
+                next_num += step
+        completed = True
+    finally:
+        for process in processes:
+            if not completed: process.terminate()
+            process.join()
+        shm.close()
+        shm.unlink()
+
+_tracker = None  # FrameTracker d'un processus du pool de track_batches
+
+def init_batch_worker(frame_source, targets_RGB, epsilon, algo, predict=False,
+                      pyramid=None):
+    '''Initialisation d'un processus du pool : la source d'images (réouverte
+       dans ce processus, cf. FrameSource) et son FrameTracker.'''
+    global _tracker
+    _tracker = FrameTracker(frame_source, targets_RGB, epsilon, algo, predict,
+                            pyramid)
+
+def track_batch(batch):
+    '''Processus du pool : traite le lot <batch> = (n° du lot, rangs des
+       frames). Renvoie le n° du lot, la liste des triplets (rang,
+       statistiques des cibles, message d'erreur ou None) et les compteurs
+       du FrameTracker pour ce lot.'''
+    num, indices = batch
+    # le lot ne suit pas forcément le lot précédent de ce processus :
+    _tracker.reset()
+    before = dict(_tracker.counters)
+    results = []
+    for index in indices:
+        try:
+            results.append((index, _tracker.stats(index), None))
+        except Exception as e:
+            results.append((index, None, str(e)))
+    counters = {key: value - before[key] for key, value in _tracker.counters.items()}
+    return num, results, counters
+
+def track_batches(frame_source, indices, targets_RGB, epsilon, algo,
+                  nb_process=None, batch_size=None, predict=False,
+                  pyramid=None):
+    '''Générateur des résultats et compteurs de track_batch, lot par lot dans l'ordre des
+       frames <indices> de la source <frame_source>. Les rangs sont coupés en
+       lots de frames consécutives (lecture séquentielle dans chaque lot)
+       traités par un pool de <nb_process> processus (par défaut un par
+       coeur) ; les lots finis dans le désordre sont remis dans l'ordre.'''
+    nb_process = nb_process or os.cpu_count()
+    indices = list(indices)
+    # plusieurs lots par processus pour équilibrer la charge :
+    batch_size = batch_size or max(1, min(64, len(indices)//(4*nb_process)))
+    batches = [(num, indices[k:k+batch_size])
+               for num, k in enumerate(range(0, len(indices), batch_size))]
+
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(nb_process, initializer=init_batch_worker,
+                        initargs=(frame_source, targets_RGB, epsilon, algo,
+                                  predict, pyramid))
+    completed = False
+    try:
+        pending, next_num = {}, 0
+        for num, results, counters in pool.imap_unordered(track_batch, batches):
+            pending[num] = results, counters
+            while next_num in pending:
+                yield pending.pop(next_num)
+                next_num += 1
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+def _center_of_frame(args):
+    frame, target_RGB, epsilon, algo = args
+    return target_center(frame, target_RGB, epsilon, algo)
+
+if __name__ == "__main__":
+    # Benchmark : python ParallelTracking.py video.mp4 [R G B [epsilon]]
+    # compare le calcul dans un seul thread (comme ExtractTargetFomImagesThread),
+    # un multiprocessing.Pool qui reçoit les frames par pickle, l'anneau
+    # en mémoire partagée et les lots de frames lues par chaque processus.
+    video_path = sys.argv[1]
+    target_RGB = np.array([int(c) for c in sys.argv[2:5]] or [255, 0, 0])
+    epsilon    = int(sys.argv[5]) if len(sys.argv) > 5 else 10
+    algo       = 'barycentre'
+
+    source = VideoStream(video_path)
+    nframes = source.nb_frames
+
+    t0 = time.perf_counter()
+    single = [target_center(source.read(i), target_RGB, epsilon, algo)
+              for i in range(1, nframes+1)]
+    t_single = time.perf_counter() - t0
+    source.close()
+
+    def frames():
+        video = cv2.VideoCapture(video_path)
+        for _, frame in read_frames(video):
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), target_RGB, epsilon, algo
+        video.release()
+
+    t0 = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(os.cpu_count()) as pool:
+        pickled = list(pool.imap(_center_of_frame, frames(), chunksize=4))
+    t_pool = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ring = [centers_from_stats(stats, algo)[0]
+            for _, stats in track_video(video_path, target_RGB, epsilon)]
+    t_ring = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batches = [center for results, _ in
+               track_batches(VideoStream(video_path), range(1, nframes+1),
+                             target_RGB, epsilon, algo)
+               for _, stats, _ in results
+               for center in centers_from_stats(stats, algo)]
+    t_batches = time.perf_counter() - t0
+
+    same = lambda a, b: all((u is None and v is None) or
+                            (u is not None and v is not None and np.allclose(u, v))
+                            for u, v in zip(a, b)) and len(a) == len(b)
+    print("{} frames, {} coeurs".format(nframes, os.cpu_count()))
+    print("un thread          : {:7.2f} s, {:7.1f} frames/s".format(t_single, nframes/t_single))
+    print("Pool + pickle      : {:7.2f} s, {:7.1f} frames/s".format(t_pool, nframes/t_pool))
+    print("mémoire partagée   : {:7.2f} s, {:7.1f} frames/s".format(t_ring, nframes/t_ring))
+    print("lots de frames     : {:7.2f} s, {:7.1f} frames/s".format(t_batches, nframes/t_batches))
+    print("résultats identiques :", same(single, pickled) and same(single, ring)
+                                    and same(single, batches))
@@ -1,6 +1,9 @@
 #
 # version 1.0 -- 2019-05-17 -- JLC -- new file
 #
+# version 1.1 -- 2026-10-18 --
+#   the time of the frames comes from the frame index of the video.
+#
 
 import numpy as np
 from numpy import * # necessary for eval(user expression)
@@ -176,9 +179,9 @@ class FunctionPlot(QWidget):
         # Récupération de la valeur de FP (Frame per seconde) pour calcul
         # du pas de temps et des abscisses :
         X = target_pos[0]
-        if self.mw.imageTab.video_FPS is not None:
-            deltaT = 1./self.mw.imageTab.video_FPS
-            self.__time = np.arange(len(X))*deltaT
+        time = self.mw.imageTab.frame_times(target_pos[2])
+        if time is not None:
+            self.__time = time
             self.__XYLabel1[0] = "temps [s]"
             self.__XYLabel2[0] = "temps [s]"
         else:
@@ -8,6 +8,10 @@
 # version 1.5 -- 2020-05-22 -- JLC -- 
 #   add Velocity tab, with smoothing buttons
 #
+# version 1.6 -- 2026-10-18 --
+#   the time of the frames comes from the frame index of the video.
+#   one curve for each target, with the color of the target.
+#
 
 import numpy as np
 from collections import deque
@@ -125,7 +129,10 @@ class OnePlot(QWidget):
         xlabel, ylabel =  "X [pixels]", "Y [pixels]"
         scale = self.mw.imageTab.pix_to_mm_coeff
         
-        X, Y = self.mw.target_pos[0], self.mw.target_pos[1]        
+        # bornes de toutes les cibles :
+        targets_pos = [target_pos for target_pos, _ in self.mw.targets()]
+        X = np.concatenate([target_pos[0] for target_pos in targets_pos])
+        Y = np.concatenate([target_pos[1] for target_pos in targets_pos])
         self.__xlim = np.array([np.nanmin(X), np.nanmax(X)])*scale
         self.__ylim = np.array([np.nanmin(Y), np.nanmax(Y)])*scale
 
@@ -172,8 +179,7 @@ class OnePlot(QWidget):
 
     def Plot(self):
 
-        target_pos = self.mw.target_pos
-        X, Y, I = target_pos
+        targets = self.mw.targets()
         scale = self.mw.imageTab.pix_to_mm_coeff
 
         self.btn_imageSize.setEnabled(True)
@@ -191,12 +197,16 @@ class OnePlot(QWidget):
         self.__ImageSizePlotXYLim()
         self.__SetAspect("equal")
 
-        # tracé de courbe paramétrée (x(t),y(t)) :
-        color = 'b' if self.mw.target_RGB is None else self.mw.target_RGB/255
-        self.__axes.plot(X*scale,Y*scale,
-                         color = color,
-                         marker = 'o', markersize = 2, linewidth = .4,
-                         label="Trajectoire XY / algo : {}".format(algo))
+        # tracé de courbe paramétrée (x(t),y(t)) de chaque cible :
+        for num, (target_pos, target_RGB) in enumerate(targets):
+            X, Y, I = target_pos
+            color = 'b' if target_RGB is None else target_RGB/255
+            label = "Trajectoire XY / algo : {}".format(algo)
+            if len(targets) > 1: label += " / cible {}".format(num+1)
+            self.__axes.plot(X*scale,Y*scale,
+                             color = color,
+                             marker = 'o', markersize = 2, linewidth = .4,
+                             label=label)
         self.__axes.grid(True)
         self.__axes.legend(loc='best',fontsize=10)
         self.__axes.set_aspect(self.__axes_aspect)
@@ -458,13 +468,33 @@ class TwoPlots(QWidget):
             
         return S                   
 
+    def __derivatives(self, data1, data2, deltaT):
+        '''Courbes à tracer pour les positions <data1>, <data2> d'une cible :
+           les positions, ou leurs dérivées (éventuellement lissées).'''
+        if self.__quantity == "position": return data1, data2
+        if deltaT is None: return None, None
+        if self.__quantity == "velocity" :
+            data1 = self.__compute_first_derivative_order4(data1, deltaT)
+            data2 = self.__compute_first_derivative_order4(data2, deltaT)
+        else:
+            data1 = self.__compute_second_derivative_order4(data1, deltaT)
+            data2 = self.__compute_second_derivative_order4(data2, deltaT)
+        data1, data2 = data1[2:-2], data2[2:-2]
+        if self.btn_smooth_x.isChecked():
+            N = self.x_mav_nb_pts.value()
+            data1 = self.__smooth_data(data1, N)
+        if self.btn_smooth_y.isChecked():
+            N = self.y_mav_nb_pts.value()
+            data2 = self.__smooth_data(data2, N)
+        return data1, data2
+
     def Plot(self):
 
-        target_pos = self.mw.target_pos
-        if target_pos is None :
+        if self.mw.target_pos is None :
             return
-        else:        
-            self.__data1, self.__data2, I = target_pos
+        targets = self.mw.targets()
+        # toutes les cibles ont les mêmes n° d'images :
+        I = targets[0][0][2]
 
         scale = self.mw.imageTab.pix_to_mm_coeff
             
@@ -485,78 +515,65 @@ class TwoPlots(QWidget):
         # Récupération de la valeur de FP (Frame per seconde) pour calcul
         # du pas de temps et des abscisses :
         deltaT = None
-        if self.mw.imageTab.video_FPS is not None:
-            deltaT = 1./self.mw.imageTab.video_FPS
-            self.__time = np.array(I)*deltaT
+        time = self.mw.imageTab.frame_times(I)
+        if time is not None:
+            # pas de temps moyen entre 2 frames traitées :
+            if len(time) > 1:
+                deltaT = (time[-1] - time[0])/(len(time) - 1)
+            else:
+                deltaT = 1./self.mw.imageTab.video_FPS
+            self.__time = time
             self.__xlabel = "temps [s]"
         else:
             self.__time = np.array(I)
             self.__xlabel = "image #"
 
+        curves = [self.__derivatives(target_pos[0], target_pos[1], deltaT)
+                  for target_pos, _ in targets]
+        data1, data2 = curves[self.mw.target_num if len(curves) > 1 else 0]
         if self.__quantity == "velocity" :
-            if deltaT is not None:
-                self.__data1 = self.__compute_first_derivative_order4(self.__data1, deltaT)
-                self.__data2 = self.__compute_first_derivative_order4(self.__data2, deltaT)
-                self.__data1, self.__data2 = self.__data1[2:-2], self.__data2[2:-2]
-                self.__time = self.__time[2:-2]
-                if self.btn_smooth_x.isChecked():
-                    N = self.x_mav_nb_pts.value()
-                    self.__data1 = self.__smooth_data(self.__data1, N)
-                if self.btn_smooth_y.isChecked():
-                    N = self.y_mav_nb_pts.value()
-                    self.__data2 = self.__smooth_data(self.__data2, N)
-                self.__AutoSizePlotXYLim()
-            else:
-                self.__data1, self.__data2 = None, None
-            self.mw.target_veloc = np.array([self.__data1, self.__data2])
-            
+            self.mw.target_veloc = np.array([data1, data2])
         elif self.__quantity == "acceleration" :
-            if deltaT is not None:
-                self.__data1 = self.__compute_second_derivative_order4(self.__data1, deltaT)
-                self.__data2 = self.__compute_second_derivative_order4(self.__data2, deltaT)
-                self.__data1, self.__data2 = self.__data1[2:-2], self.__data2[2:-2]
-                self.__time = self.__time[2:-2]
-                if self.btn_smooth_x.isChecked():
-                    N = self.x_mav_nb_pts.value()
-                    self.__data1 = self.__smooth_data(self.__data1, N)
-                if self.btn_smooth_y.isChecked():
-                    N = self.y_mav_nb_pts.value()
-                    self.__data2 = self.__smooth_data(self.__data2, N)
-                self.__AutoSizePlotXYLim()
-            else:
-                self.__data1, self.__data2 = None, None
-            self.mw.target_accel = np.array([self.__data1, self.__data2])
-            
+            self.mw.target_accel = np.array([data1, data2])
+        if data1 is None or data2 is None: return
+
+        # bornes de toutes les cibles :
+        self.__data1 = np.concatenate([data1 for data1, _ in curves])
+        self.__data2 = np.concatenate([data2 for _, data2 in curves])
+        if self.__quantity in ("velocity", "acceleration"):
+            self.__time = self.__time[2:-2]
+            self.__AutoSizePlotXYLim()
         else:
             self.__ImageSizePlotXYLim()
         
-        if self.__data1 is None or self.__data2 is None: return
-        
         curveLabelX, curveLabelY = TwoPlots.CurveLabels[self.__quantity]
         if self.__quantity == "position" :
             Xlabel, Ylabel = curveLabelX.format(algo), curveLabelY.format(algo)
         else:
             Xlabel, Ylabel = curveLabelX.format(""), curveLabelY.format("")
 
-        color = 'b' if self.mw.target_RGB is None else self.mw.target_RGB/255
+        for num, ((data1, data2), (_, target_RGB)) in enumerate(zip(curves, targets)):
+            color = 'b' if target_RGB is None else target_RGB/255
+            suffix = " cible {}".format(num+1) if len(targets) > 1 else ""
+
+            # First drwaing on X:
+            self.__axes1.plot(self.__time, data1*scale,
+                              color = color,
+                              marker = 'o', markersize = 2,
+                              linewidth = .4,
+                              label=Xlabel+suffix)
+
+            # Second drawing on Y:
+            self.__axes2.plot(self.__time, data2*scale,
+                              color = color,
+                              marker = 'o', markersize = 2,
+                              linewidth = .4, 
+                              label=Ylabel+suffix)
 
-        # First drwaing on X:
-        self.__axes1.plot(self.__time, self.__data1*scale,
-                          color = color,
-                          marker = 'o', markersize = 2,
-                          linewidth = .4,
-                          label=Xlabel)
         self.__axes1.grid(True)
         #self.__axes1.legend(fontsize=9, framealpha=0.7,
         #                   bbox_to_anchor=(-0.1, 1.1), loc='upper left')
         self.__axes1.legend(loc='best',fontsize=10)
-
-        # Second drawing on Y:
-        self.__axes2.plot(self.__time, self.__data2*scale,
-                          color = color,
-                          marker = 'o', markersize = 2,
-                          linewidth = .4, 
-                          label=Ylabel)
         self.__axes2.grid(True)
         #self.__axes2.legend(fontsize=9, framealpha=0.7,
         #                   bbox_to_anchor=(1.1, 1.1), loc='upper right')
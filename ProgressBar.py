@@ -5,13 +5,30 @@
 # version 1.3 -- 2020-04-30 -- JLC --
 #   revision for using firt, last and step to loop into the images to process
 #
+# version 1.4 -- 2026-10-18 --
+#   add the extraction threads of the video split and of the target tracking
+#   with several processes.
+#   the target extraction reports the duplicated frames not processed again.
+#   add the target extraction by a pool of processes.
+#   the target extraction can search the target in a predicted window.
+#   the target extraction can search the target coarse-to-fine.
+#   the target extraction fills the statistics of the frames.
+#   add the epsilon sweep.
+#   add thread_complete: result of the split thread or of the epsilon sweep.
+#   OK is only enabled at the end of the thread, Cancel waits for the thread.
+#   the shared-memory target extraction shows its report.
+#   add full_frame_stats: were the statistics of the extraction exact?
+#
 
-import os
 import cv2
 from PyQt5.Qt import (QDialog, QLabel, QProgressBar, QPushButton,
                       QVBoxLayout, QHBoxLayout, QMessageBox)
 from PyQt5.QtCore import Qt
-from ThreadedWork import SplitVideoInImagesThread, ExtractTargetFomImagesThread
+from FrameSource import nb_frames_in_range
+from ThreadedWork import (SplitVideoInImagesThread, SplitVideoInSegmentsThread,
+                          SplitVideoInCubeThread, ExtractTargetFomImagesThread,
+                          ExtractTargetSharedMemoryThread,
+                          ExtractTargetFromBatchesThread, EpsilonSweepThread)
 
 class ProgressBar(QDialog):
 
@@ -21,7 +38,6 @@ class ProgressBar(QDialog):
 
         self.__thread      = None       # l'objet QThread qui fera le calcul
         self.__images_dir  = __images_dir # le dossier des images
-        self.__images_list = None       # la liste des images *.png à traiter
         self.__vMin        = None       # la valeur min de la barre
         self.__vMax        = None       # la valeur max de la barre
 
@@ -50,9 +66,13 @@ class ProgressBar(QDialog):
         self.setWindowModality(Qt.ApplicationModal)
         self.show()
 
-    def configure_for_video_extraction(self, videoCapture, imagesFormat):
+    def configure_for_video_extraction(self, videoCapture, imagesFormat,
+                                       compression=1,
+                                       first_last_step=(1, None, 1),
+                                       roi_scale=(None, 1)):
         self.__vMin = 1
-        self.__vMax = int(videoCapture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.__vMax = nb_frames_in_range(int(videoCapture.get(cv2.CAP_PROP_FRAME_COUNT)),
+                                         *first_last_step)
         self.pbar.setRange(self.__vMin, self.__vMax)
         self.pbar.setValue(self.__vMin)
 
@@ -61,21 +81,74 @@ class ProgressBar(QDialog):
 
         self.__thread = SplitVideoInImagesThread(videoCapture,
                                                  self.__images_dir,
-                                                 imagesFormat)
+                                                 imagesFormat,
+                                                 compression,
+                                                 first_last_step=first_last_step,
+                                                 roi_scale=roi_scale)
 
         self.__thread.ImageExtractedSig.connect(self.updateProgressBar)
         self.__thread.ImageProblemSig.connect(self.updateProgressBar)
-        self.__thread.start()
+        self.__thread.ReportSig.connect(self.showReport)
+        self.__start_thread()
+
+    def configure_for_cube_extraction(self, videoCapture,
+                                      first_last_step=(1, None, 1),
+                                      roi_scale=(None, 1),
+                                      nbVideoFrames=None):
+        self.__vMin = 1
+        nbVideoFrames = nbVideoFrames or int(videoCapture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.__vMax = nb_frames_in_range(nbVideoFrames, *first_last_step)
+        self.pbar.setRange(self.__vMin, self.__vMax)
+        self.pbar.setValue(self.__vMin)
+
+        self.setWindowTitle('Découpage de la vidéo')
+        self.title.setText("Extraction images : ")
+
+        self.__thread = SplitVideoInCubeThread(videoCapture, self.__images_dir,
+                                               first_last_step, roi_scale,
+                                               nbVideoFrames)
+
+        self.__thread.ImageExtractedSig.connect(self.updateProgressBar)
+        self.__thread.ImageProblemSig.connect(self.updateProgressBar)
+        self.__start_thread()
+
+    def configure_for_parallel_video_extraction(self, videoPath, imagesFormat,
+                                                nbProcess, compression=1,
+                                                first_last_step=(1, None, 1),
+                                                roi_scale=(None, 1)):
+        video = cv2.VideoCapture(videoPath)
+        self.__vMin = 1
+        self.__vMax = nb_frames_in_range(int(video.get(cv2.CAP_PROP_FRAME_COUNT)),
+                                         *first_last_step)
+        video.release()
+        self.pbar.setRange(self.__vMin, self.__vMax)
+        self.pbar.setValue(self.__vMin)
+
+        self.setWindowTitle('Découpage de la vidéo ({} processus)'.format(nbProcess))
+        self.title.setText("Extraction images : ")
+
+        self.__thread = SplitVideoInSegmentsThread(videoPath,
+                                                   self.__images_dir,
+                                                   imagesFormat,
+                                                   nbProcess,
+                                                   compression,
+                                                   first_last_step,
+                                                   roi_scale)
+
+        self.__thread.ImageExtractedSig.connect(self.updateProgressBar)
+        self.__thread.ImageProblemSig.connect(self.updateProgressBar)
+        self.__start_thread()
 
     def configure_for_target_extraction(self,
+                                        frame_source,
                                         target_RGB,
                                         algo,
                                         marge_couleur,
                                         target_pos,
-                                        first_last_step):
-
-        self.__images_list = [ f for f in os.listdir(self.__images_dir) if f.endswith(".png")]
-        self.__images_list.sort()
+                                        first_last_step,
+                                        predict=False,
+                                        pyramid=None,
+                                        frame_stats=None):
 
         self.__vMin, self.__vMax, _ =  first_last_step
         self.pbar.setRange(self.__vMin, self.__vMax)
@@ -85,22 +158,142 @@ class ProgressBar(QDialog):
                             .format(self.__images_dir))
 
         # Lancer un __thread pour le travil d'extraction des images de la vidéo :
-        self.__thread = ExtractTargetFomImagesThread(self.__images_dir,
-                                                     self.__images_list,
+        self.__thread = ExtractTargetFomImagesThread(frame_source,
                                                      target_RGB,
                                                      algo,
                                                      marge_couleur,
                                                      target_pos,
-                                                     first_last_step)
+                                                     first_last_step,
+                                                     predict,
+                                                     pyramid,
+                                                     frame_stats)
         self.__thread.TargetExtractedSig.connect(self.updateProgressBar)
         self.__thread.TargetProblemSig.connect(self.updateProgressBar)
+        self.__thread.ReportSig.connect(self.showReport)
+        self.__start_thread()
+
+    def configure_for_parallel_target_extraction(self,
+                                                 videoPath,
+                                                 roi_scale,
+                                                 target_RGB,
+                                                 algo,
+                                                 marge_couleur,
+                                                 target_pos,
+                                                 first_last_step,
+                                                 nbProcess=None,
+                                                 pyramid=None,
+                                                 frame_stats=None):
+
+        self.__vMin, self.__vMax, _ =  first_last_step
+        self.pbar.setRange(self.__vMin, self.__vMax)
+        self.pbar.setValue(self.__vMin)
+
+        self.setWindowTitle('Traitement des frames de la vidéo {} (multi-processus)'\
+                            .format(self.__images_dir))
+
+        self.__thread = ExtractTargetSharedMemoryThread(videoPath,
+                                                        roi_scale,
+                                                        target_RGB,
+                                                        algo,
+                                                        marge_couleur,
+                                                        target_pos,
+                                                        first_last_step,
+                                                        nbProcess,
+                                                        pyramid,
+                                                        frame_stats)
+        self.__thread.TargetExtractedSig.connect(self.updateProgressBar)
+        self.__thread.TargetProblemSig.connect(self.updateProgressBar)
+        self.__thread.ReportSig.connect(self.showReport)
+        self.__start_thread()
+
+    def configure_for_batch_target_extraction(self,
+                                              frame_source,
+                                              target_RGB,
+                                              algo,
+                                              marge_couleur,
+                                              target_pos,
+                                              first_last_step,
+                                              nbProcess=None,
+                                              predict=False,
+                                              pyramid=None,
+                                              frame_stats=None):
+
+        self.__vMin, self.__vMax, _ =  first_last_step
+        self.pbar.setRange(self.__vMin, self.__vMax)
+        self.pbar.setValue(self.__vMin)
+
+        self.setWindowTitle('Traitement des images du dossier {} (multi-processus)'\
+                            .format(self.__images_dir))
+
+        self.__thread = ExtractTargetFromBatchesThread(frame_source,
+                                                       target_RGB,
+                                                       algo,
+                                                       marge_couleur,
+                                                       target_pos,
+                                                       first_last_step,
+                                                       nbProcess,
+                                                       predict,
+                                                       pyramid,
+                                                       frame_stats)
+        self.__thread.TargetExtractedSig.connect(self.updateProgressBar)
+        self.__thread.TargetProblemSig.connect(self.updateProgressBar)
+        self.__thread.ReportSig.connect(self.showReport)
+        self.__start_thread()
+
+    def configure_for_epsilon_sweep(self,
+                                    frame_source,
+                                    target_RGB,
+                                    max_epsilon,
+                                    first_last_step,
+                                    sweep):
+
+        self.__vMin, self.__vMax, _ =  first_last_step
+        self.pbar.setRange(self.__vMin, self.__vMax)
+        self.pbar.setValue(self.__vMin)
+
+        self.setWindowTitle("Balayage d'epsilon de 0 à {}".format(max_epsilon))
+
+        self.__thread = EpsilonSweepThread(frame_source,
+                                           target_RGB,
+                                           max_epsilon,
+                                           first_last_step,
+                                           sweep)
+        self.__thread.TargetExtractedSig.connect(self.updateProgressBar)
+        self.__thread.TargetProblemSig.connect(self.updateProgressBar)
+        self.__start_thread()
+
+    def __start_thread(self):
+        # OK n'est possible qu'à la fin du thread : exec_() ne renvoie pas
+        # avant, sauf par Cancel qui attend l'arrêt du thread
+        self.__thread.finished.connect(lambda: self.btnOk.setEnabled(True))
         self.__thread.start()
 
+    def reject(self):
+        # fermeture de la fenêtre (Echap, bouton de fermeture) pendant le
+        # travail : comme Cancel
+        if self.__thread is not None and self.__thread.isRunning():
+            self.Cancel()
+        else:
+            QDialog.reject(self)
+
+    def thread_complete(self):
+        '''True si le thread de découpage ou de balayage d'epsilon, terminé
+           quand exec_() renvoie, a traité toutes les frames.'''
+        return self.__thread.isFinished() and self.__thread.is_complete()
+
+    def full_frame_stats(self):
+        '''True si le thread d'extraction de la cible a calculé toutes les
+           statistiques des images sur toute l'image.'''
+        return self.__thread.isFinished() and self.__thread.full_frame_stats()
+
     def Cancel(self):
         # Appui sur le bouton Cancel.
 
-        # Arrêter le Thread en cours :
+        # Arrêter le Thread en cours et attendre qu'il soit arrêté (il ne
+        # doit plus écrire dans le dossier des images) :
+        self.__thread.requestInterruption()
         self.__thread.quit()
+        self.__thread.wait()
         # Fermer la fenêtre QDialog avec un code retour à -1 :
         self.done(-1)
 
@@ -108,9 +301,6 @@ class ProgressBar(QDialog):
         if value >= 0:
             # l'image N° <value> vient d'être traitée avec succès :
             self.pbar.setValue(value)
-            self.btnOk.setEnabled(True)
-            if value == 0 or value == self.pbar.maximum():
-                self.btnOk.setEnabled(True)
             mess = "{:3d}/{:3d}".format(value,self.__vMax)
         else:
             # l'image N° <value> a provoqué une erreur :
@@ -118,3 +308,7 @@ class ProgressBar(QDialog):
             mess += '\n Erreur image {}'.format(-value)
 
         self.title.setText("Extraction images : " + mess)
+
+    def showReport(self, report):
+        # bilan affiché sous la barre à la fin du travail :
+        self.title.setText(self.title.text() + '\n' + report)
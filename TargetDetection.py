@@ -0,0 +1,944 @@
+#
+# version 1.0 -- 2026-10-18 --
+#   the color-target detection moved out of ExtractTargetFomImagesThread so
+#   that it can be applied to any frame (PNG image or video frame).
+#   the color mask is made by cv2.inRange with bounds clamped to [0, 255].
+#   add FrameTracker: target centers along the frames of a frame source.
+#   FrameTracker can search the target in a window around the position
+#   predicted from the previous detections.
+#   the center is computed from the moments and the bounding box of the mask,
+#   without the arrays of the coordinates of the pixels.
+#   several targets of different colors are tracked with one read of each frame.
+#   add ColorClassifier: HSV, Lab or Mahalanobis color model of the selected
+#   patch, compiled into a quantized RGB lookup table.
+#   add target_center_pyramid: the target is found on a subsampled copy of
+#   the frame, its center refined in a full-resolution window; FrameTracker
+#   checks some of the searches against the full-frame center.
+#   the detection gives the statistics of the mask of each frame (count,
+#   sums, bounding box), saved in a sidecar file keyed by color and epsilon:
+#   the centers are computed from them for any algorithm.
+#   add epsilon_sweep: the statistics of the masks for all the values of
+#   epsilon from one pass on the frame.
+#   the statistics of the color box are computed by the detection kernel
+#   chosen for the machine (cf. DetectionKernels).
+#   add MotionDetector: the moving target is found by a background
+#   subtraction (MOG2 or KNN) on downsampled frames, its center refined at
+#   full resolution.
+#   add TemplateTracker: the selected patch is followed by normalized
+#   cross-correlation in a window around its predicted position.
+#   FrameTracker compares a frame read from the video with the previous one
+#   instead of hashing a reduced copy.
+#   the coarse search subsamples the frame once for all the targets, with
+#   cv2.resize instead of a strided copy; the pyramid checks are more
+#   frequent after a miss.
+#   the benchmarks warm the detection kernel up before timing it.
+#   add PyramidSearch: the coarse-to-fine search and its adaptive checks,
+#   shared by FrameTracker and the shared-memory tracking workers.
+#   add full_frame_stats: were all the statistics computed on the full frame?
+#
+
+import time, os, hashlib
+import cv2
+import numpy as np
+
+from DetectionKernels import detection_kernel
+
+def color_bounds(target_RGB, epsilon):
+    '''Bornes basse et haute (uint8) des couleurs à +/- epsilon de
+       target_RGB, ramenées dans [0, 255].'''
+    rgb = np.asarray(target_RGB, dtype=int)
+    lower = np.clip(rgb - epsilon, 0, 255).astype(np.uint8)
+    upper = np.clip(rgb + epsilon, 0, 255).astype(np.uint8)
+    return lower, upper
+
+class ColorClassifier:
+    '''Modèle de la couleur d'une cible construit à partir des pixels <patch>
+       (tableau (..., 3) RGB) sélectionnés sur l'image, dans l'espace
+       <space> :
+       - 'HSV' : teinte et saturation des pixels du patch élargies de
+         <epsilon>, quelle que soit la luminosité (sauf pixels trop sombres
+         dont la teinte n'a pas de sens) ;
+       - 'Lab' : distance à la couleur moyenne du patch, la luminance L
+         comptant pour moitié, inférieure à la dispersion du patch + epsilon ;
+       - 'Mahalanobis' : ellipsoïde à 3 sigmas de la covariance RGB du patch,
+         régularisée par epsilon**2.
+       Le modèle est compilé une fois en une table (lut) des couleurs RGB
+       quantifiées sur <bits> bits par canal : classer un pixel coûte une
+       lecture de la table.'''
+
+    spaces = ("HSV", "Lab", "Mahalanobis")
+    dark   = 32    # valeur V en dessous de laquelle la teinte est ignorée
+
+    def __init__(self, patch, space, epsilon, bits=5):
+        patch = np.asarray(patch, dtype=np.uint8).reshape(-1, 3)
+        self.space = space
+        self.RGB   = np.round(patch.mean(axis=0)).astype(int) # couleur des tracés
+        self.shift = 8 - bits
+        # centres des cellules de la table, dans l'ordre des index R, G, B :
+        n = 1 << bits
+        levels = (np.arange(n) << self.shift) + (1 << self.shift)//2
+        cells = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'),
+                         axis=-1).reshape(1, -1, 3).astype(np.uint8)
+        if space == "HSV":
+            accept = self.__hsv(patch, cells, epsilon)
+        elif space == "Lab":
+            accept = self.__lab(patch, cells, epsilon)
+        elif space == "Mahalanobis":
+            accept = self.__mahalanobis(patch, cells, epsilon)
+        else:
+            raise Exception("espace de couleur <{}> inconnu".format(space))
+        self.lut = np.where(accept.ravel(), 255, 0).astype(np.uint8)
+        # boîte RGB englobant les cellules acceptées, seuillée par
+        # cv2.inRange avant la lecture de la table :
+        inside = cells[0][self.lut > 0]
+        if len(inside) == 0:
+            self.lower = self.upper = None
+        else:
+            half = (1 << self.shift)//2
+            self.lower = (inside.min(axis=0) - half).astype(np.uint8)
+            self.upper = (inside.max(axis=0) + half - 1).astype(np.uint8)
+
+    @staticmethod
+    def __hsv(patch, cells, epsilon):
+        hsv = cv2.cvtColor(patch.reshape(1, -1, 3), cv2.COLOR_RGB2HSV)[0].astype(int)
+        H, S, V = cv2.cvtColor(cells, cv2.COLOR_RGB2HSV)[0].astype(int).T
+        # teinte sur un cercle de 180 (OpenCV) : écart à la teinte moyenne
+        angle = hsv[:,0]*np.pi/90
+        h0 = np.arctan2(np.sin(angle).mean(), np.cos(angle).mean())*90/np.pi
+        dh = lambda h: np.abs((h - h0 + 90) % 180 - 90)
+        h_max = np.percentile(dh(hsv[:,0]), 95) + epsilon/2
+        s_min = np.percentile(hsv[:,1], 5) - epsilon
+        s_max = np.percentile(hsv[:,1], 95) + epsilon
+        return ((dh(H) <= h_max) & (S >= s_min) & (S <= s_max) &
+                (V >= ColorClassifier.dark))
+
+    @staticmethod
+    def __lab(patch, cells, epsilon):
+        weights = np.array([.5, 1., 1.])  # moins sensible à l'éclairage
+        lab = cv2.cvtColor(patch.reshape(1, -1, 3), cv2.COLOR_RGB2Lab)[0]*weights
+        mean = lab.mean(axis=0)
+        d_max = np.percentile(np.linalg.norm(lab - mean, axis=1), 95) + epsilon
+        cells_lab = cv2.cvtColor(cells, cv2.COLOR_RGB2Lab)[0]*weights
+        return np.linalg.norm(cells_lab - mean, axis=1) <= d_max
+
+    @staticmethod
+    def __mahalanobis(patch, cells, epsilon):
+        rgb = patch.astype(float)
+        mean = rgb.mean(axis=0)
+        cov = np.cov(rgb, rowvar=False) if len(rgb) > 1 else np.zeros((3, 3))
+        inverse = np.linalg.inv(cov + epsilon**2*np.eye(3))
+        d = cells[0] - mean
+        return np.einsum('ij,jk,ik->i', d, inverse, d) <= 3**2
+
+    def mask(self, pixelsTab):
+        '''Masque uint8 (255 ou 0) des pixels de <pixelsTab> acceptés par le
+           modèle. Seuls les pixels du rectangle englobant les pixels de la
+           boîte des couleurs acceptées (cv2.inRange) sont lus dans la table.'''
+        if self.lower is None:
+            return np.zeros(pixelsTab.shape[:2], dtype=np.uint8)
+        mask = cv2.inRange(pixelsTab, self.lower, self.upper)
+        x, y, w, h = cv2.boundingRect(mask)
+        if w == 0: return mask
+        bits = 8 - self.shift
+        p = pixelsTab[y:y+h, x:x+w] >> self.shift
+        index = ((p[...,0].astype(np.uint16) << 2*bits) |
+                 (p[...,1].astype(np.uint16) << bits) | p[...,2])
+        mask[y:y+h, x:x+w] &= self.lut.take(index)
+        return mask
+
+class MotionDetector:
+    '''Détection de la cible mobile, sans condition sur sa couleur, par
+       soustraction du fond : le modèle du fond (<method> 'MOG2' ou 'KNN'
+       d'OpenCV) est appris et appliqué sur les frames réduites à
+       <work_width> pixels de large ; la plus grande tache de premier plan
+       est la cible. Ses statistiques (cf. mask_stats) sont calculées en
+       pleine résolution, dans le rectangle de la tache, sur les pixels qui
+       s'écartent du fond (seuil d'Otsu). Les frames doivent être données
+       dans l'ordre, après learn_background.'''
+
+    methods     = ("MOG2", "KNN")
+    work_width  = 320    # largeur [pixels] des frames réduites
+    sample_size = 25     # nombre de frames de l'estimation initiale du fond
+    rate        = 0.005  # vitesse d'apprentissage du fond pendant le suivi
+    max_area    = 0.25   # tache plus grande : changement global, ignorée
+
+    def __init__(self, method="MOG2", RGB=(0, 0, 0)):
+        if method not in MotionDetector.methods:
+            raise Exception("soustraction du fond <{}> inconnue".format(method))
+        self.method = method
+        self.RGB    = np.asarray(RGB, dtype=int)  # couleur des tracés
+        self.factor = None
+        if method == "MOG2":
+            self.__subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+        else:
+            self.__subtractor = cv2.createBackgroundSubtractorKNN(detectShadows=False)
+
+    def __small(self, pixelsTab):
+        height, width = pixelsTab.shape[:2]
+        if self.factor is None:
+            self.factor = max(1, round(width/MotionDetector.work_width))
+        f = self.factor
+        return cv2.resize(pixelsTab, (width//f, height//f),
+                          interpolation=cv2.INTER_AREA)
+
+    def learn_background(self, frame_source, indices):
+        '''Modèle initial du fond : médiane, pixel par pixel, de
+           <sample_size> frames réparties parmi les rangs <indices> de
+           <frame_source> ; la cible, qui se déplace, n'y est pas.'''
+        indices = list(indices)
+        ranks = np.linspace(0, len(indices)-1,
+                            min(len(indices), MotionDetector.sample_size))
+        samples = np.stack([self.__small(frame_source.read(indices[int(k)]))
+                            for k in ranks])
+        background = np.median(samples, axis=0).astype(np.uint8)
+        self.__subtractor.apply(background, learningRate=1.)
+        for _ in range(4): self.__subtractor.apply(background, learningRate=0.5)
+
+    def stats(self, pixelsTab):
+        '''Statistiques (cf. mask_stats) de la cible mobile dans la frame
+           <pixelsTab>, suivante de la précédente.'''
+        small = self.__small(pixelsTab)
+        f = self.factor
+        foreground = self.__subtractor.apply(small, learningRate=MotionDetector.rate)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_OPEN,
+                                      np.ones((3, 3), np.uint8))
+        n, labels, blobs, _ = cv2.connectedComponentsWithStats(foreground)
+        if n < 2: return 0., 0., 0., (0, 0, 0, 0)
+        k = 1 + np.argmax(blobs[1:, cv2.CC_STAT_AREA])
+        x, y, w, h, area = blobs[k]
+        if area > MotionDetector.max_area*small.shape[0]*small.shape[1]:
+            return 0., 0., 0., (0, 0, 0, 0)
+
+        # rectangle de la tache élargi d'un pixel réduit, en pleine
+        # résolution sur la grille des blocs de f x f pixels :
+        cx0, cy0 = max(0, x-1), max(0, y-1)
+        cx1, cy1 = min(small.shape[1], x+w+1), min(small.shape[0], y+h+1)
+        x0, y0, x1, y1 = cx0*f, cy0*f, cx1*f, cy1*f
+        background = cv2.resize(self.__subtractor.getBackgroundImage()[cy0:cy1, cx0:cx1],
+                                (x1-x0, y1-y0), interpolation=cv2.INTER_LINEAR)
+        diff = cv2.absdiff(pixelsTab[y0:y1, x0:x1], background).max(axis=2)
+        _, mask = cv2.threshold(diff, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        blob = cv2.dilate(np.where(labels[cy0:cy1, cx0:cx1] == k, 255, 0).astype(np.uint8),
+                          np.ones((3, 3), np.uint8))
+        mask &= cv2.resize(blob, (x1-x0, y1-y0), interpolation=cv2.INTER_NEAREST)
+        count, sum_x, sum_y, (bx, by, bw, bh) = mask_stats(mask)
+        if count == 0:
+            # centre de la tache à basse résolution (centres des blocs) :
+            count = float(area*f*f)
+            return (count, ((x + w/2)*f - 1/2)*count, ((y + h/2)*f - 1/2)*count,
+                    (x*f, y*f, w*f, h*f))
+        return count, sum_x + x0*count, sum_y + y0*count, (x0 + bx, y0 + by, bw, bh)
+
+class TemplateTracker:
+    '''Suivi du motif <template> (pixels RGB sélectionnés sur l'image, coin
+       haut gauche en <position> = (x, y)) par corrélation croisée
+       normalisée (cv2.matchTemplate, TM_CCOEFF_NORMED) dans une fenêtre
+       autour de la position prédite à vitesse constante. Si le meilleur
+       score y est inférieur à <threshold>, le motif est cherché dans une
+       fenêtre 4 fois plus large, puis dans toute l'image ; s'il y reste
+       inférieur, il n'est pas trouvé. La position du pic est affinée au
+       dixième de pixel (parabole sur les voisins). Quand le score baisse
+       sous <refresh> (la cible tourne, se déforme), le motif est remplacé
+       par les pixels trouvés. Les frames doivent être données dans
+       l'ordre.'''
+
+    threshold = 0.6   # score minimal d'une correspondance
+    refresh   = 0.9   # score en dessous duquel le motif est mis à jour
+    margin    = 32    # demi-largeur [pixels] ajoutée au motif pour la fenêtre
+
+    def __init__(self, template, position, RGB=(0, 0, 0), threshold=None,
+                 refresh=None):
+        self.template  = np.ascontiguousarray(template, dtype=np.uint8)
+        self.RGB       = np.asarray(RGB, dtype=int)  # couleur des tracés
+        self.threshold = threshold or TemplateTracker.threshold
+        self.refresh   = refresh or TemplateTracker.refresh
+        self.__last    = [tuple(float(v) for v in position)] # coins trouvés
+        self.counters  = {"windowed": 0, "widened": 0, "fullFrame": 0,
+                          "lost": 0, "refreshed": 0}
+
+    def __match(self, pixelsTab, x0, y0):
+        '''Meilleur score et coin haut gauche (sous-pixel, coordonnées de la
+           frame) du motif dans <pixelsTab> vu depuis le coin (x0, y0).'''
+        h, w = self.template.shape[:2]
+        if pixelsTab.shape[0] < h or pixelsTab.shape[1] < w: return -1., None
+        scores = cv2.matchTemplate(pixelsTab, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(scores)
+        def peak(a, b, c):
+            d = a - 2*b + c
+            return 0. if d >= 0 else (a - c)/(2*d)
+        dx = peak(*scores[y, x-1:x+2]) if 0 < x < scores.shape[1]-1 else 0.
+        dy = peak(*scores[y-1:y+2, x]) if 0 < y < scores.shape[0]-1 else 0.
+        return score, (x0 + x + dx, y0 + y + dy)
+
+    def stats(self, pixelsTab):
+        '''Statistiques (présentation de mask_stats) du motif trouvé dans la
+           frame <pixelsTab>, suivante de la précédente : un "pixel" au
+           centre du motif et le rectangle du motif ; aucune s'il n'est pas
+           trouvé.'''
+        h, w = self.template.shape[:2]
+        height, width = pixelsTab.shape[:2]
+        x, y = self.__last[-1]
+        if len(self.__last) > 1:
+            x, y = 2*x - self.__last[-2][0], 2*y - self.__last[-2][1]
+        # correspondance faible : recherche dans une fenêtre plus large,
+        # puis dans toute l'image
+        for m, counter in ((TemplateTracker.margin, "windowed"),
+                           (4*TemplateTracker.margin, "widened"),
+                           (max(width, height), "fullFrame")):
+            x0, y0 = max(0, int(x) - m), max(0, int(y) - m)
+            x1, y1 = min(width, int(x) + w + m + 1), min(height, int(y) + h + m + 1)
+            score, corner = self.__match(pixelsTab[y0:y1, x0:x1], x0, y0)
+            self.counters[counter] += 1
+            if score >= self.threshold: break
+        else:
+            self.counters["lost"] += 1
+            return 0., 0., 0., (0, 0, 0, 0)
+        if score < self.refresh:
+            bx, by = int(round(corner[0])), int(round(corner[1]))
+            if 0 <= bx <= width-w and 0 <= by <= height-h:
+                self.template = np.ascontiguousarray(pixelsTab[by:by+h, bx:bx+w])
+                self.counters["refreshed"] += 1
+        self.__last = [self.__last[-1], corner]
+        cx, cy = corner[0] + (w-1)/2, corner[1] + (h-1)/2
+        return 1., cx, cy, (int(round(corner[0])), int(round(corner[1])), w, h)
+
+    def report(self):
+        '''Bilan des recherches dans la fenêtre et dans toute l'image.'''
+        return ("{} recherches du motif dans la fenêtre, {} reprises dans une "
+                "fenêtre plus large, {} sur toute l'image, {} échecs, {} mises à "
+                "jour du motif".format(self.counters["windowed"],
+                                       self.counters["widened"],
+                                       self.counters["fullFrame"],
+                                       self.counters["lost"],
+                                       self.counters["refreshed"]))
+
+def target_list(targets):
+    '''Liste des cibles : <targets> est une couleur RGB, un ColorClassifier,
+       un MotionDetector ou un TemplateTracker, ou une liste (un tableau) de
+       ces cibles.'''
+    objects = (ColorClassifier, MotionDetector, TemplateTracker)
+    if isinstance(targets, objects): return [targets]
+    if isinstance(targets, (list, tuple)) and \
+       any(isinstance(target, objects) for target in targets):
+        return list(targets)
+    return list(np.atleast_2d(targets))
+
+def target_mask(pixelsTab, target_RGB, epsilon):
+    '''Masque uint8 (255 ou 0) des pixels de <pixelsTab> dont la couleur est
+       à +/- epsilon de target_RGB : une seule passe de cv2.inRange, sans
+       tableau intermédiaire ni débordement des soustractions en uint8.
+       Si target_RGB est un ColorClassifier, c'est son masque (epsilon est
+       déjà dans sa table).'''
+    if isinstance(target_RGB, ColorClassifier):
+        return target_RGB.mask(pixelsTab)
+    lower, upper = color_bounds(target_RGB, epsilon)
+    return cv2.inRange(pixelsTab, lower, upper)
+
+def mask_stats(mask):
+    '''Statistiques du masque uint8 <mask> calculées sans tableau des
+       coordonnées des pixels : nombre de pixels non nuls, sommes de leurs
+       abscisses et de leurs ordonnées (cv2.moments) et rectangle englobant
+       (x, y, w, h) (cv2.boundingRect).'''
+    m = cv2.moments(mask, binaryImage=True)
+    return m['m00'], m['m10'], m['m01'], cv2.boundingRect(mask)
+
+def center_from_stats(stats, algo):
+    '''Centre (x, y) des pixels décrits par <stats> (cf. mask_stats) calculé
+       avec l'algorithme <algo> ('barycentre' ou 'minmax'), None s'il n'y a
+       aucun pixel.'''
+    count, sum_x, sum_y, (x, y, w, h) = stats
+    if count == 0: return None
+    if algo == 'barycentre':
+        return sum_x/count, sum_y/count
+    elif algo == 'minmax':
+        return x + (w-1)/2, y + (h-1)/2
+
+def centers_from_stats(stats, algo):
+    '''Liste des centres (ou None) calculés avec <algo> à partir de la liste
+       des statistiques <stats> des cibles.'''
+    return [center_from_stats(target_stats, algo) for target_stats in stats]
+
+def target_stats(pixelsTab, target_RGB, epsilon):
+    '''Statistiques (cf. mask_stats) du masque des pixels de <pixelsTab> dont
+       la couleur est à +/- epsilon de target_RGB, calculées par le noyau de
+       détection de la machine (cf. DetectionKernels) pour une couleur RGB.'''
+    if isinstance(target_RGB, ColorClassifier):
+        return mask_stats(target_RGB.mask(pixelsTab))
+    if isinstance(target_RGB, (MotionDetector, TemplateTracker)):
+        return target_RGB.stats(pixelsTab)
+    lower, upper = color_bounds(target_RGB, epsilon)
+    return detection_kernel().box_stats(pixelsTab, lower, upper)
+
+def target_center(pixelsTab, target_RGB, epsilon, algo):
+    '''Renvoie le centre (x, y) des pixels de <pixelsTab> dont la couleur est
+       à +/- epsilon de target_RGB, calculé avec l'algorithme <algo>
+       ('barycentre' ou 'minmax'), ou None si aucun pixel ne convient.'''
+
+    return center_from_stats(target_stats(pixelsTab, target_RGB, epsilon), algo)
+
+def targets_stats(pixelsTab, targets_RGB, epsilon, pyramid_search=None, key=None):
+    '''Liste des statistiques des cibles <targets_RGB> (cf. target_list)
+       dans <pixelsTab>, lu une seule fois. Avec <pyramid_search> (cf.
+       PyramidSearch), chaque cible est d'abord cherchée à basse résolution
+       dans la frame de rang <key>.'''
+    stats = []
+    for target_RGB in targets_RGB:
+        window_stats = None
+        if pyramid_search is not None:
+            window_stats = pyramid_search.stats(key, pixelsTab, target_RGB,
+                                                epsilon)
+        if window_stats is None:
+            window_stats = target_stats(pixelsTab, target_RGB, epsilon)
+        stats.append(window_stats)
+    return stats
+
+def target_stats_in_window(pixelsTab, target_RGB, epsilon, window):
+    '''Comme target_stats, mais seuls les pixels de la fenêtre
+       window = (x0, y0, x1, y1) sont seuillés ; les statistiques sont
+       ramenées aux coordonnées de l'image. Renvoie None si aucun pixel ne
+       convient ou si des pixels de la cible touchent un bord de la fenêtre
+       intérieur à l'image : la cible déborde peut-être.'''
+    height, width = pixelsTab.shape[:2]
+    x0, y0, x1, y1 = window
+    x0, y0 = max(0, int(x0)), max(0, int(y0))
+    x1, y1 = min(width, int(x1)), min(height, int(y1))
+    if x1 <= x0 or y1 <= y0: return None
+
+    count, sum_x, sum_y, (x, y, w, h) = target_stats(pixelsTab[y0:y1, x0:x1],
+                                                     target_RGB, epsilon)
+    if count == 0: return None
+    if (x0 > 0 and x == 0) or (x1 < width  and x+w == x1-x0) or \
+       (y0 > 0 and y == 0) or (y1 < height and y+h == y1-y0):
+        return None
+    return count, sum_x + x0*count, sum_y + y0*count, (x0 + x, y0 + y, w, h)
+
+def target_center_in_window(pixelsTab, target_RGB, epsilon, algo, window):
+    '''Comme target_center, mais seuls les pixels de la fenêtre <window>
+       sont seuillés (cf. target_stats_in_window).'''
+    stats = target_stats_in_window(pixelsTab, target_RGB, epsilon, window)
+    return None if stats is None else center_from_stats(stats, algo)
+
+def subsample(pixelsTab, factor, dst=None):
+    '''Image <pixelsTab> sous-échantillonnée d'un facteur <factor> : un
+       pixel sur <factor> dans chaque direction, sans mélange des couleurs
+       (les pixels de pixelsTab[::factor, ::factor]). Le plus proche voisin
+       de cv2.resize évite la copie de la vue à pas ; le résultat est écrit
+       dans <dst> s'il a la bonne taille.'''
+    return cv2.resize(pixelsTab, None, dst=dst, fx=1/factor, fy=1/factor,
+                      interpolation=cv2.INTER_NEAREST)
+
+def target_stats_pyramid(pixelsTab, target_RGB, epsilon, factor, small=None):
+    '''Comme target_stats, mais la cible est d'abord cherchée dans l'image
+       sous-échantillonnée d'un facteur <factor> (cf. subsample, <small>
+       si elle est déjà calculée), puis ses statistiques sont calculées en
+       pleine résolution dans le rectangle trouvé, élargi de 2 pixels
+       sous-échantillonnés. Renvoie None si la cible n'est pas vue à basse
+       résolution ou si elle touche un bord de la fenêtre : il faut alors la
+       chercher dans toute l'image.'''
+    if small is None: small = subsample(pixelsTab, factor)
+    x, y, w, h = target_stats(small, target_RGB, epsilon)[3]
+    if w == 0: return None
+    window = ((x-2)*factor, (y-2)*factor, (x+w+2)*factor, (y+h+2)*factor)
+    return target_stats_in_window(pixelsTab, target_RGB, epsilon, window)
+
+def target_center_pyramid(pixelsTab, target_RGB, epsilon, algo, factor):
+    '''Comme target_center, avec une recherche grossière puis fine (cf.
+       target_stats_pyramid).'''
+    stats = target_stats_pyramid(pixelsTab, target_RGB, epsilon, factor)
+    return None if stats is None else center_from_stats(stats, algo)
+
+class PyramidSearch:
+    '''Recherche grossière puis fine (cf. target_stats_pyramid) des cibles
+       dans des frames successives, avec <pyramid> = (facteur, tolérance) :
+       chaque frame n'est sous-échantillonnée qu'une fois pour toutes les
+       cibles. La tolérance n'est pas garantie pour chaque frame : seules
+       certaines recherches sont vérifiées par le calcul sur toute l'image,
+       dont le centre (algorithme <algo>) est gardé s'il est à plus de
+       <tolérance> pixel. Une recherche sur check_max est vérifiée tant
+       qu'il n'y a pas d'écart ; après un écart, l'intervalle des
+       vérifications est divisé par 4 (jusqu'à chaque recherche), puis
+       doublé à chaque vérification réussie.
+       Les recherches sont comptées dans <counters> (clés "pyramid",
+       "pyramidFull", "pyramidChecked" et "pyramidMiss").'''
+
+    check_max = 50    # au plus une recherche à basse résolution sur 50 est vérifiée
+
+    def __init__(self, pyramid, algo, counters):
+        self.factor, self.tolerance = pyramid
+        self.algo     = algo
+        self.counters = counters
+        for key in ("pyramid", "pyramidFull", "pyramidChecked", "pyramidMiss"):
+            counters.setdefault(key, 0)
+        # intervalle des vérifications et nombre de recherches avant la
+        # prochaine
+        self.__check_every = PyramidSearch.check_max
+        self.__until_check = 0
+        self.reset()
+
+    def reset(self):
+        '''Oublie la frame sous-échantillonnée.'''
+        self.__small     = None # frame sous-échantillonnée (cf. subsample)
+        self.__small_key = None # rang de la frame sous-échantillonnée
+
+    def stats(self, key, pixelsTab, target_RGB, epsilon):
+        '''Statistiques de la cible <target_RGB> dans la frame <pixelsTab>
+           de rang <key>, ou None s'il faut la chercher dans toute l'image.'''
+        self.counters["pyramid"] += 1
+        if self.__small_key != key:
+            self.__small = subsample(pixelsTab, self.factor, self.__small)
+            self.__small_key = key
+        stats = target_stats_pyramid(pixelsTab, target_RGB, epsilon,
+                                     self.factor, self.__small)
+        if stats is None:
+            self.counters["pyramidFull"] += 1
+            return stats
+        self.__until_check -= 1
+        if self.__until_check < 0:
+            self.counters["pyramidChecked"] += 1
+            full = target_stats(pixelsTab, target_RGB, epsilon)
+            center = center_from_stats(stats, self.algo)
+            full_center = center_from_stats(full, self.algo)
+            if full_center is None or \
+               np.hypot(*np.subtract(center, full_center)) > self.tolerance:
+                self.counters["pyramidMiss"] += 1
+                stats = full
+                self.__check_every = max(1, self.__check_every//4)
+            else:
+                self.__check_every = min(PyramidSearch.check_max,
+                                         2*self.__check_every)
+            self.__until_check = self.__check_every - 1
+        return stats
+
+def epsilon_sweep(pixelsTab, target_RGB, max_epsilon):
+    '''Statistiques des masques de target_RGB (couleur RGB) pour tous les
+       epsilon de 0 à <max_epsilon>, en une seule passe sur <pixelsTab> :
+       la distance de Chebyshev (plus grand écart sur R, G et B) à
+       target_RGB des pixels à moins de max_epsilon est calculée une fois,
+       les histogrammes par distance du nombre de pixels, des sommes de
+       leurs x et y et de leurs x, y extrêmes sont cumulés jusqu'à chaque
+       epsilon. Tableau (max_epsilon+1, 7) : nombre, somme x, somme y,
+       x min, y min, x max, y max (cf. sweep_stats).'''
+    tab = np.zeros((max_epsilon+1, 7))
+    points = cv2.findNonZero(target_mask(pixelsTab, target_RGB, max_epsilon))
+    if points is None: return tab
+    X, Y = points.reshape(-1, 2).T
+    rgb = np.asarray(target_RGB, dtype=np.int16)
+    distance = np.abs(pixelsTab[Y, X].astype(np.int16) - rgb).max(axis=1)
+
+    count = np.bincount(distance, minlength=max_epsilon+1)
+    tab[:,0] = np.cumsum(count)
+    tab[:,1] = np.cumsum(np.bincount(distance, X, max_epsilon+1))
+    tab[:,2] = np.cumsum(np.bincount(distance, Y, max_epsilon+1))
+    # extrêmes de chaque distance : les pixels rangés par distance, chaque
+    # distance présente commence à starts :
+    order = np.argsort(distance, kind='stable')
+    present = count > 0
+    starts = (np.cumsum(count) - count)[present]
+    for col, coords, reduce, empty in ((3, X, np.minimum, np.inf),
+                                       (4, Y, np.minimum, np.inf),
+                                       (5, X, np.maximum, -np.inf),
+                                       (6, Y, np.maximum, -np.inf)):
+        extreme = np.full(max_epsilon+1, empty)
+        extreme[present] = reduce.reduceat(coords[order], starts)
+        tab[:,col] = reduce.accumulate(extreme)
+    return tab
+
+def sweep_stats(sweep, epsilon):
+    '''Statistiques (cf. mask_stats) du masque à +/- <epsilon> lues dans le
+       tableau <sweep> d'epsilon_sweep.'''
+    count, sum_x, sum_y, x0, y0, x1, y1 = sweep[epsilon]
+    if count == 0: return 0., 0., 0., (0, 0, 0, 0)
+    return count, sum_x, sum_y, (int(x0), int(y0), int(x1-x0)+1, int(y1-y0)+1)
+
+stats_prefix = "stats_"  # fichiers des statistiques des frames
+
+def stats_key(target_RGB, epsilon, source=""):
+    '''Clé des statistiques des frames pour la cible <target_RGB> (couleur
+       ou ColorClassifier) et <epsilon> ; <source> distingue les frames
+       d'une même vidéo lues avec des recadrages différents.'''
+    h = hashlib.blake2b(digest_size=8)
+    if isinstance(target_RGB, ColorClassifier):
+        h.update(target_RGB.space.encode())
+        h.update(target_RGB.lut.tobytes())
+    else:
+        h.update(np.asarray(target_RGB, dtype='<i8').tobytes())
+    h.update("{}|{}".format(epsilon, source).encode())
+    return h.hexdigest()
+
+def save_frame_stats(path, frame_stats):
+    '''Ajoute au fichier <path> les statistiques <frame_stats> (rang de la
+       frame -> statistiques d'une cible, cf. mask_stats) : une ligne
+       (rang, nombre, somme x, somme y, x, y, w, h) par frame.'''
+    stats = load_frame_stats(path)
+    stats.update(frame_stats)
+    tab = np.array([(index, count, sum_x, sum_y, *rect)
+                    for index, (count, sum_x, sum_y, rect) in sorted(stats.items())],
+                   dtype=float)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, tab)
+    os.replace(tmp, path)
+
+def load_frame_stats(path):
+    '''Dictionnaire rang de la frame -> statistiques lu dans le fichier
+       <path>, vide si le fichier n'existe pas.'''
+    try:
+        tab = np.load(path)
+    except (OSError, ValueError):
+        return {}
+    return {int(row[0]): (row[1], row[2], row[3], tuple(int(v) for v in row[4:8]))
+            for row in tab}
+
+class FrameTracker:
+    '''Calcule les statistiques (cf. mask_stats) et les centres des cibles
+       <targets_RGB> (couleurs ou ColorClassifier, cf. target_list) dans les
+       frames successives d'une source d'images (cf. FrameSource) : chaque
+       frame est lue une seule fois pour toutes les cibles. Une frame dont
+       l'empreinte est celle de la frame précédente n'est ni relue ni
+       retraitée : on reprend ses statistiques.
+       Avec <predict>, la position de chaque cible est prédite à vitesse
+       constante à partir de ses 2 dernières détections et seule une fenêtre
+       autour de la prédiction est seuillée ; si la cible n'y est pas
+       trouvée, on la cherche dans toute l'image.
+       Avec <pyramid> = (facteur, tolérance), la cible est cherchée à basse
+       résolution puis en pleine résolution (cf. PyramidSearch, dont la
+       tolérance n'est vérifiée que sur une partie des recherches).
+       Une frame identique à la précédente n'est pas retraitée : elle est
+       reconnue par son empreinte si la source en a, sinon (lecture directe
+       de la vidéo, si stream_dedup) par comparaison avec la frame
+       précédente.
+       Tient le compte des frames traitées, du temps passé à les traiter,
+       des frames identiques, des recherches dans la fenêtre et à basse
+       résolution.'''
+
+    window_margin = 32    # demi-largeur minimale [pixels] de la fenêtre
+    stream_dedup  = True  # frames lues dans la vidéo comparées à la précédente
+    sample_step   = 16    # pas de l'échantillon de pixels comparé en premier
+
+    def __init__(self, frame_source, targets_RGB, epsilon, algo, predict=False,
+                 pyramid=None):
+        self.source      = frame_source
+        self.targets_RGB = target_list(targets_RGB)
+        self.epsilon     = epsilon
+        self.algo        = algo
+        self.predict     = predict
+        self.pyramid     = pyramid
+        self.counters    = {"processed": 0, "workTime": 0., "duplicated": 0,
+                            "windowed": 0, "fullFrame": 0, "pyramid": 0,
+                            "pyramidFull": 0, "pyramidChecked": 0,
+                            "pyramidMiss": 0, "compareTime": 0.}
+        self.__pyramid_search = None if pyramid is None else \
+                                PyramidSearch(pyramid, algo, self.counters)
+        self.reset()
+
+    def reset(self):
+        '''Oublie les frames précédentes (avant de traiter des frames qui ne
+           suivent pas les précédentes).'''
+        self.__prev_fingerprint = None # empreinte de la frame précédente
+        self.__prev_stats       = None # statistiques de la frame précédente
+        self.__prev_frame       = None # frame précédente lue dans la vidéo
+        # 2 dernières détections (rang, centre) de chaque cible :
+        self.__history = [[] for _ in self.targets_RGB]
+        if self.__pyramid_search is not None: self.__pyramid_search.reset()
+
+    def window(self, index, num=0):
+        '''Fenêtre (x0, y0, x1, y1) autour de la position de la cible <num>
+           prédite pour la frame de rang <index>, ou None s'il n'y a pas assez
+           de détections précédentes.'''
+        if len(self.__history[num]) < 2: return None
+        (i0, (x0, y0)), (i1, (x1, y1)) = self.__history[num]
+        vx, vy = (x1-x0)/(i1-i0), (y1-y0)/(i1-i0)  # vitesse [pixels/rang]
+        dx, dy = vx*(index-i1), vy*(index-i1)
+        x, y = x1 + dx, y1 + dy
+        # la fenêtre grandit avec le déplacement prédit :
+        hw = FrameTracker.window_margin + 2*abs(dx)
+        hh = FrameTracker.window_margin + 2*abs(dy)
+        return x-hw, y-hh, x+hw+1, y+hh+1
+
+    def __detect(self, index, pixelsTab, num):
+        target_RGB = self.targets_RGB[num]
+        window = self.window(index, num) if self.predict else None
+        stats = None
+        if window is not None:
+            self.counters["windowed"] += 1
+            stats = target_stats_in_window(pixelsTab, target_RGB, self.epsilon,
+                                           window)
+        if stats is None and window is not None: self.counters["fullFrame"] += 1
+        if stats is None and self.__pyramid_search is not None:
+            stats = self.__pyramid_search.stats(index, pixelsTab, target_RGB,
+                                                self.epsilon)
+        if stats is None:
+            stats = target_stats(pixelsTab, target_RGB, self.epsilon)
+        center = center_from_stats(stats, self.algo)
+        if center is None:
+            self.__history[num] = []
+        else:
+            self.__history[num] = (self.__history[num] + [(index, center)])[-2:]
+        return stats
+
+    def __same_frame(self, pixelsTab):
+        # frame lue identique à la précédente ? Comparaison d'abord sur un
+        # échantillon de pixels (la plupart des frames diffèrent), puis sur
+        # toute la frame :
+        prev = self.__prev_frame
+        if prev is None or prev.shape != pixelsTab.shape: return False
+        s = FrameTracker.sample_step
+        return np.array_equal(prev[::s, ::s], pixelsTab[::s, ::s]) and \
+               np.array_equal(prev, pixelsTab)
+
+    def stats(self, index):
+        '''Renvoie la liste des statistiques (cf. mask_stats) des cibles dans
+           la frame de rang <index>.'''
+        fingerprint = self.source.fingerprint(index)
+        if fingerprint is not None and fingerprint == self.__prev_fingerprint:
+            # frame identique (empreinte de toute la frame) : ni lecture ni
+            # seuillage
+            self.counters["duplicated"] += 1
+            return self.__prev_stats
+        pixelsTab = self.source.read(index)
+        if fingerprint is None and FrameTracker.stream_dedup:
+            # pas d'empreinte (lecture directe de la vidéo) : comparaison
+            # avec la frame précédente, dont le temps est compté
+            t1 = time.perf_counter()
+            same = self.__same_frame(pixelsTab)
+            self.counters["compareTime"] += time.perf_counter() - t1
+            self.__prev_frame = pixelsTab
+            if same:
+                self.counters["duplicated"] += 1
+                return self.__prev_stats
+        t0 = time.perf_counter()
+        stats = [self.__detect(index, pixelsTab, num)
+                 for num in range(len(self.targets_RGB))]
+        self.counters["processed"] += 1
+        self.counters["workTime"] += time.perf_counter() - t0
+        self.__prev_fingerprint, self.__prev_stats = fingerprint, stats
+        return stats
+
+    def centers(self, index):
+        '''Renvoie la liste des centres (x, y) des cibles dans la frame de
+           rang <index>, None pour une cible dont aucun pixel ne convient.'''
+        return centers_from_stats(self.stats(index), self.algo)
+
+    def report(self):
+        '''Bilan du suivi (cf. tracking_report).'''
+        return tracking_report(self.counters)
+
+def tracking_report(counters):
+    '''Bilan des frames identiques non retraitées, le temps gagné étant
+       estimé avec le temps moyen de détection moins le temps passé à
+       comparer les frames lues, des recherches dans la fenêtre prédite et à
+       basse résolution (les compteurs absents sont nuls). None s'il n'y a
+       rien à signaler.'''
+    lines = []
+    if counters.get("duplicated", 0) > 0:
+        savedTime = counters["workTime"]/max(1, counters["processed"])*\
+                    counters["duplicated"] - counters["compareTime"]
+        savedTime = max(0., savedTime)
+        lines.append("{} images identiques à la précédente non retraitées, "
+                     "{:.2f} s gagnées sur la détection (comparaison des "
+                     "images lues : {:.2f} s)".format(counters["duplicated"],
+                                                      savedTime,
+                                                      counters["compareTime"]))
+    if counters.get("windowed", 0) > 0:
+        lines.append("{} images cherchées dans la fenêtre prédite, dont {} "
+                     "reprises sur toute l'image".format(counters["windowed"],
+                                                        counters["fullFrame"]))
+    if counters.get("pyramid", 0) > 0:
+        lines.append("{} recherches à basse résolution, dont {} reprises sur "
+                     "toute l'image, {} écarts au-delà de la tolérance sur {} "
+                     "vérifications".format(counters["pyramid"],
+                                            counters["pyramidFull"],
+                                            counters["pyramidMiss"],
+                                            counters["pyramidChecked"]))
+    return "\n".join(lines) or None
+
+def full_frame_stats(counters):
+    '''True si, d'après les compteurs <counters> du suivi (cf.
+       tracking_report), toutes les statistiques ont été calculées sur toute
+       l'image : aucune n'est celle d'une fenêtre prédite ou d'une recherche
+       grossière, qui sont approchées.'''
+    return counters.get("windowed", 0) == counters.get("fullFrame", 0) and \
+           counters.get("pyramid", 0) == counters.get("pyramidFull", 0) + \
+                                         counters.get("pyramidMiss", 0)
+
+if __name__ == "__main__":
+    # Micro-benchmark sur des frames 1080p : masque par 3 comparaisons
+    # numpy (ancienne expression) contre cv2.inRange, centre par np.nonzero
+    # contre centre par les moments, puis recherche dans toute l'image
+    # contre recherche dans une fenêtre, masques des ColorClassifier, et
+    # recherche grossière puis fine en 1080p et 4K.
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, size=(10, 1080, 1920, 3), dtype=np.uint8)
+    frames[:, 500:540, 900:960] = (200, 30, 40)   # la cible
+    target_RGB, epsilon = np.array([200, 30, 40]), 10
+
+    # choix du noyau de détection (autotune s'il n'est pas encore fait) et
+    # compilation éventuelle pour une frame contiguë et pour une fenêtre
+    # (vue non contiguë) avant les mesures :
+    kernel = detection_kernel()
+    for layout in (frames[0], frames[0][100:200, 100:300]):
+        kernel.box_stats(layout, *color_bounds(target_RGB, epsilon))
+    print("noyau de détection :", kernel.name)
+
+    def numpy_mask(pixelsTab, target_RGB, epsilon):
+        r,g,b = target_RGB
+        return (abs(pixelsTab[:,:,0]-r) <= epsilon)* \
+               (abs(pixelsTab[:,:,1]-g) <= epsilon)* \
+               (abs(pixelsTab[:,:,2]-b) <= epsilon)*1
+
+    for name, mask in (("numpy", numpy_mask), ("cv2.inRange", target_mask)):
+        t0 = time.perf_counter()
+        for frame in frames: mask(frame, target_RGB, epsilon)
+        dt = (time.perf_counter() - t0)/len(frames)
+        print("{:12s}: {:6.2f} ms/frame".format(name, 1000*dt))
+
+    # centre d'une grande cible (1/4 de l'image) : tableaux des indices des
+    # pixels (np.nonzero) contre moments et rectangle englobant
+    big = frames[0].copy()
+    big[200:740, 400:1360] = (200, 30, 40)
+    mask = target_mask(big, target_RGB, epsilon)
+    t0 = time.perf_counter()
+    for _ in range(10):
+        Y, X = np.nonzero(mask)
+        c_nonzero = X.mean(), Y.mean()
+    dt_nonzero = (time.perf_counter() - t0)/10
+    t0 = time.perf_counter()
+    for _ in range(10):
+        c_moments = center_from_stats(mask_stats(mask), 'barycentre')
+    dt_moments = (time.perf_counter() - t0)/10
+    print("centre grande cible, np.nonzero : {:6.2f} ms, moments : {:6.2f} ms, "
+          "écart : {:.1e} pixel".format(1000*dt_nonzero, 1000*dt_moments,
+                                      np.abs(np.subtract(c_nonzero, c_moments)).max()))
+
+    # seuillage limité à la fenêtre prédite autour de la cible :
+    window = (900-FrameTracker.window_margin, 500-FrameTracker.window_margin,
+              960+FrameTracker.window_margin, 540+FrameTracker.window_margin)
+    t0 = time.perf_counter()
+    for frame in frames:
+        target_center_in_window(frame, target_RGB, epsilon, 'barycentre', window)
+    dt_window = (time.perf_counter() - t0)/len(frames)
+    t0 = time.perf_counter()
+    for frame in frames: target_center(frame, target_RGB, epsilon, 'barycentre')
+    dt_full = (time.perf_counter() - t0)/len(frames)
+    print("centre, image entière : {:6.2f} ms/frame, fenêtre : {:6.3f} ms/frame"\
+          .format(1000*dt_full, 1000*dt_window))
+
+    # mêmes pixels quand les soustractions ne débordent pas (target_RGB en
+    # entiers numpy int64) :
+    same = all(np.array_equal(numpy_mask(f, target_RGB, epsilon) > 0,
+                              target_mask(f, target_RGB, epsilon) > 0)
+               for f in frames)
+    print("masques identiques :", same)
+
+    # avec des entiers Python les soustractions restent en uint8 et
+    # débordent : l'ancienne expression perd des pixels de la cible
+    r,g,b = (int(c) for c in target_RGB)
+    wrapped = numpy_mask(frames[0], (r, g, b), epsilon) > 0
+    print("pixels trouvés, uint8 qui déborde : {}, cv2.inRange : {}"\
+          .format(wrapped.sum(), (target_mask(frames[0], target_RGB, epsilon) > 0).sum()))
+
+    # modèles de couleur compilés en table, une moitié de la cible à l'ombre
+    # (couleur x 0.6). Sur ce bruit aléatoire des pixels de la boîte des
+    # couleurs acceptées sont partout : toute l'image est lue dans la table
+    # (pire cas) ; dans une vraie vidéo seul le voisinage de la cible l'est.
+    shaded = frames.copy()
+    shaded[:, 500:540, 930:960] = (120, 18, 24)
+    patch = frames[0][500:540, 900:930]
+    for space in ColorClassifier.spaces:
+        classifier = ColorClassifier(patch, space, epsilon)
+        t0 = time.perf_counter()
+        for frame in shaded: classifier.mask(frame)
+        dt = (time.perf_counter() - t0)/len(frames)
+        print("{:12s}: {:6.2f} ms/frame, pixels de la cible trouvés : {}"\
+              .format(space, 1000*dt,
+                      (classifier.mask(shaded[0])[500:540, 900:960] > 0).sum()))
+    print("{:12s}: pixels de la cible trouvés : {} sur {}".format("RGB",
+          (target_mask(shaded[0], target_RGB, epsilon)[500:540, 900:960] > 0).sum(),
+          40*60))
+
+    # recherche grossière puis fine, sur un fond sans pixel de la couleur
+    # de la cible (sur le bruit aléatoire, des pixels isolés de la couleur
+    # de la cible sont partout et comptent dans le centre sur toute l'image) :
+    for width, height in ((1920, 1080), (3840, 2160)):
+        scene = np.empty((5, height, width, 3), dtype=np.uint8)
+        scene[:] = (90, 120, 60)
+        for k in range(5):
+            x, y = 300 + 250*k, 200 + 120*k
+            cv2.circle(scene[k], (x, y), 15, (200, 30, 40), -1)
+        t0 = time.perf_counter()
+        full = [target_center(f, target_RGB, epsilon, 'barycentre') for f in scene]
+        dt_full = (time.perf_counter() - t0)/len(scene)
+        for factor in (4, 8):
+            t0 = time.perf_counter()
+            coarse = [target_center_pyramid(f, target_RGB, epsilon, 'barycentre', factor)
+                      for f in scene]
+            dt = (time.perf_counter() - t0)/len(scene)
+            print("{}x{} image entière : {:6.2f} ms, grossière puis fine {}x : "
+                  "{:6.2f} ms, écart max : {:.1e} pixel".format(width, height,
+                  1000*dt_full, factor, 1000*dt,
+                  max(np.hypot(*np.subtract(c, f)) for c, f in zip(coarse, full))))
+
+    # balayage de tous les epsilon en une passe, contre une extraction par
+    # epsilon :
+    max_epsilon = 50
+    t0 = time.perf_counter()
+    for frame in scene: [target_stats(frame, target_RGB, e) for e in range(max_epsilon+1)]
+    dt_each = (time.perf_counter() - t0)/len(scene)
+    t0 = time.perf_counter()
+    sweeps = [epsilon_sweep(frame, target_RGB, max_epsilon) for frame in scene]
+    dt_sweep = (time.perf_counter() - t0)/len(scene)
+    same = all(np.allclose(sweep_stats(sweep, e)[:3], target_stats(frame, target_RGB, e)[:3])
+               and sweep_stats(sweep, e)[3] == target_stats(frame, target_RGB, e)[3]
+               for frame, sweep in zip(scene, sweeps) for e in range(max_epsilon+1))
+    print("epsilon 0 à {}, une extraction par epsilon : {:6.2f} ms/frame, "
+          "balayage : {:6.2f} ms/frame, statistiques identiques : {}"\
+          .format(max_epsilon, 1000*dt_each, 1000*dt_sweep, same))
+
+    # soustraction du fond en 1080p sur un seul coeur : disque uni, de la
+    # couleur du fond à 20 niveaux près, qui traverse une scène texturée
+    cv2.setNumThreads(1)
+    background = cv2.GaussianBlur(rng.integers(60, 200, (1080, 1920, 3), dtype=np.uint8),
+                                  (0, 0), 8)
+    scene, truth = [], []
+    for k in range(60):
+        frame = background.copy()
+        x, y = 200 + 25*k, 300 + 8*k
+        color = tuple(int(c) + 20 for c in background[y, x])
+        cv2.circle(frame, (x, y), 40, color, -1)
+        scene.append(frame)
+        truth.append((x, y))
+    class Scene:
+        def read(self, index): return scene[index]
+    for method in MotionDetector.methods:
+        detector = MotionDetector(method)
+        detector.learn_background(Scene(), range(len(scene)))
+        t0 = time.perf_counter()
+        centers = [center_from_stats(detector.stats(f), 'barycentre') for f in scene]
+        dt = (time.perf_counter() - t0)/len(scene)
+        errors = [np.hypot(*np.subtract(c, t)) for c, t in zip(centers, truth)
+                  if c is not None]
+        print("soustraction du fond {} 1080p, 1 coeur : {:6.2f} ms/frame "
+              "({:.0f} frames/s), cible trouvée {}/{}, écart max {:.2f} pixel"\
+              .format(method, 1000*dt, 1/dt, len(errors), len(scene), max(errors)))
+
+    # suivi d'un motif texturé sur un fond texturé : fenêtre autour de la
+    # position prédite contre recherche dans toute l'image
+    texture = cv2.GaussianBlur(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8),
+                               (0, 0), 2)
+    scene, truth = [], []
+    for k in range(60):
+        frame = background.copy()
+        x, y = 200 + 25*k, 300 + 8*k
+        frame[y:y+64, x:x+64] = texture
+        scene.append(frame)
+        truth.append((x + 31.5, y + 31.5))
+    tracker = TemplateTracker(texture, (200, 300))
+    t0 = time.perf_counter()
+    centers = [center_from_stats(tracker.stats(f), 'barycentre') for f in scene]
+    dt = (time.perf_counter() - t0)/len(scene)
+    t0 = time.perf_counter()
+    for f in scene[:5]: cv2.matchTemplate(f, texture, cv2.TM_CCOEFF_NORMED)
+    dt_full = (time.perf_counter() - t0)/5
+    print("motif 1080p, 1 coeur : fenêtre {:6.2f} ms/frame, toute l'image {:6.2f} "
+          "ms/frame, écart max {:.2f} pixel".format(1000*dt, 1000*dt_full,
+          max(np.hypot(*np.subtract(c, t)) for c, t in zip(centers, truth))))
+    print(tracker.report())
@@ -3,120 +3,723 @@
 #   revision from "tracker video JLC solution".
 # version 1.3 -- 2020-04-30 -- JLC --
 #   revision for using firt, last and step to loop into the images to process
+# version 1.4 -- 2026-10-18 --
+#   the target extraction reads its frames from a FrameSource, so a video can
+#   be tracked directly without splitting it into PNG files.
+#   add SplitVideoInSegmentsThread: the video is split by several processes,
+#   each one decoding its own segment of frames.
+#   SplitVideoInImagesThread: decoding and PNG encoding are pipelined through
+#   a bounded queue feeding a pool of encoder threads.
+#   add SplitVideoInCubeThread: the frames are written in a memory-mapped
+#   .npy file instead of PNG files.
+#   the split threads only keep the frames first, first+step, ... <= last.
+#   the split threads can crop and downscale the frames.
+#   add ExtractTargetSharedMemoryThread: the frames of the video are decoded
+#   by one process in shared memory and tracked by several processes.
+#   add ProxyFramesThread: low-resolution copies of the frames for browsing.
+#   the split threads compute the fingerprints of the frames, the target
+#   extraction reuses the center of the previous frame for duplicated frames.
+#   add ExtractTargetFromBatchesThread: the frames are tracked by a pool of
+#   processes, in batches.
+#   the target extraction threads can use a predicted search window.
+#   add TargetsPositions: several targets are tracked in a single pass.
+#   the target extraction threads can search the targets coarse-to-fine.
+#   the target extraction threads give the statistics of the masks of the
+#   frames, the centers are computed from them.
+#   add EpsilonSweepThread: the statistics of the targets for all the values
+#   of epsilon, from one read of each frame.
+#   the detection kernel is chosen before the target extraction (cf.
+#   DetectionKernels), the worker processes reuse the choice.
+#   ExtractTargetFomImagesThread learns the background of the MotionDetector
+#   targets before tracking them.
+#   ExtractTargetFomImagesThread reports the searches of the TemplateTracker
+#   targets.
+#   the split threads tell whether all the frames read were written.
+#   SplitVideoInCubeThread sizes the file from the frame index when there is
+#   one, a video with more frames than the file is an incomplete split.
+#   ExtractTargetFomImagesThread stops when it is interrupted.
+#   ExtractTargetSharedMemoryThread reports the checks of the coarse-to-fine
+#   search.
+#   EpsilonSweepThread tells whether all the frames were swept.
+#   the target extraction threads tell whether their statistics were all
+#   computed on the full frame.
 #
 
 import cv2
 import numpy as np
-import scipy
-if scipy.__version__ < "1.3":
-    from scipy.misc import imread
-else:
-    import imageio
-    from imageio import imread
+import os, time
+import multiprocessing, threading
+from queue import Queue, Empty
 from PyQt5.QtCore import QThread, pyqtSignal
+from TargetDetection import (FrameTracker, tracking_report, target_list,
+                             centers_from_stats, epsilon_sweep, MotionDetector,
+                             TemplateTracker, full_frame_stats)
+from DetectionKernels import detection_kernel
+from FrameSource import (FrameCube, read_frames, nb_frames_in_range, ingest_size,
+                         frame_fingerprint, save_fingerprints)
+from ParallelTracking import track_video, track_batches
 
 class SplitVideoInImagesThread(QThread):
     '''Thread chargé de l'extraction des images, avec envoi
-       du signal ImageProblemSig à la barre de progression'''
+       du signal ImageProblemSig à la barre de progression.
+       Ce thread décode la vidéo et dépose les frames dans une file bornée,
+       vidée par un pool de threads qui encodent les fichiers PNG (cv2
+       relâche le GIL pendant l'encodage). La borne de la file limite la
+       mémoire utilisée quand l'encodage est plus lent que le décodage.'''
 
-    # Définition de 2 signaux associés à un paramètre entier (n° image) :
-    ImageExtractedSig = pyqtSignal(int)
+    # Définition de 2 signaux associés à un paramètre entier :
+    ImageExtractedSig = pyqtSignal(int)  # nombre d'images écrites
     ImageProblemSig   = pyqtSignal(int)
+    # Signal du bilan des débits de décodage et d'encodage :
+    ReportSig         = pyqtSignal(str)
 
-    def __init__(self, videoCapture, imageDir, imagesFormat):
+    def __init__(self, videoCapture, imageDir, imagesFormat,
+                 compression=1, nbEncoders=None, first_last_step=(1, None, 1),
+                 roi_scale=(None, 1)):
         super().__init__()
         self.__video = videoCapture      # l'objet openCV.VideoCapture 
         self.__imDir = imageDir           # le répertoire où écrire les images
         self.__fileNameFormat = imagesFormat  # le format des noms d'images
+        self.__first_last_step = first_last_step # frames à garder
+        self.__roi_scale = roi_scale      # recadrage et facteur de réduction
+        self.__compression = compression  # niveau de compression PNG (0 à 9)
+        self.__nbEncoders = nbEncoders or os.cpu_count() # nb threads d'encodage
+        self.__lock = threading.Lock()
+        self.__nbWritten = 0              # nombre d'images écrites
+        self.__encodeTime = 0.            # temps cumulé d'encodage [s]
+        self.__fingerprints = {}          # rang -> empreinte de l'image
+        self.__complete = False           # toutes les frames lues écrites ?
+
+    def is_complete(self):
+        '''True si le découpage est allé à son terme et que toutes les
+           frames lues, au moins une, ont été écrites.'''
+        return self.__complete
+
+    def __encode(self, frames):
+        '''Boucle d'un thread d'encodage : écrit les frames de la file
+           <frames> jusqu'à recevoir None.'''
+        params = [cv2.IMWRITE_PNG_COMPRESSION, self.__compression]
+        while True:
+            item = frames.get()
+            if item is None: break
+            i, frame = item
+            img_path = self.__imDir + self.__fileNameFormat.format(i)
+            t0 = time.perf_counter()
+            if not cv2.imwrite(img_path, frame, params):
+                self.ImageProblemSig.emit(-i)
+                continue
+            dt = time.perf_counter() - t0
+            fingerprint = frame_fingerprint(frame)
+            with self.__lock:
+                self.__fingerprints[i] = fingerprint
+                self.__encodeTime += dt
+                self.__nbWritten += 1
+                nbWritten = self.__nbWritten
+            # émettre le signal ImageExtractedSig avec le nombre d'images
+            # écrites pour faire avancer la barre de progression connectée
+            # à ce signal :
+            self.ImageExtractedSig.emit(nbWritten)
 
     def run(self):
-        if self.__video.isOpened():
-            i = 1
-            returnVal, frame = self.__video.read()
-            while returnVal:
-                img_path = self.__imDir + self.__fileNameFormat.format(i)
-                cv2.imwrite(img_path,frame)                
-                # émettre le signal ImageExtractedSig avec le n° d'image
-                # pour faire avancer la barre de progression connectée
-                # à ce signal :
-                self.ImageExtractedSig.emit(i)                                                                
-
-                i += 1
-                returnVal, frame = self.__video.read()
-            
+        if not self.__video.isOpened():
+            print("Some problem occured...")
+            return
+
+        frames = Queue(maxsize=2*self.__nbEncoders)
+        encoders = [threading.Thread(target=self.__encode, args=(frames,))
+                    for _ in range(self.__nbEncoders)]
+        for encoder in encoders: encoder.start()
+
+        # les images gardées sont numérotées à partir de 1 :
+        i, decodeTime = 1, 0.
+        video_frames = read_frames(self.__video, *self.__first_last_step,
+                                   *self.__roi_scale)
+        t0 = time.perf_counter()
+        item = next(video_frames, None)
+        decodeTime += time.perf_counter() - t0
+        while item is not None and not self.isInterruptionRequested():
+            frames.put((i, item[1]))  # bloquant si la file est pleine
+            i += 1
+            t0 = time.perf_counter()
+            item = next(video_frames, None)
+            decodeTime += time.perf_counter() - t0
+
+        for _ in encoders: frames.put(None)
+        for encoder in encoders: encoder.join()
+        save_fingerprints(self.__imDir, self.__fingerprints)
+        self.__complete = not self.isInterruptionRequested() and \
+                          0 < self.__nbWritten == i-1
+
+        # bilan : débit du décodage et débit total des threads d'encodage
+        nbImages = self.__nbWritten
+        if nbImages == 0: return
+        decodeFPS = nbImages/decodeTime if decodeTime > 0 else float("inf")
+        encodeFPS = nbImages/self.__encodeTime if self.__encodeTime > 0 else float("inf")
+        report  = "décodage : {:.0f} images/s, ".format(decodeFPS)
+        report += "encodage : {:.0f} images/s ({} threads x {:.0f} images/s)"\
+                  .format(encodeFPS*self.__nbEncoders, self.__nbEncoders, encodeFPS)
+        if decodeFPS < encodeFPS*self.__nbEncoders:
+            report += ", limité par le décodage"
         else:
+            report += ", limité par l'encodage"
+        print(report)
+        self.ReportSig.emit(report)
+
+class SplitVideoInCubeThread(QThread):
+    '''Thread chargé de l'extraction des images dans un seul fichier
+       <frames.npy> en mémoire mappée (cf. FrameSource.FrameCube), avec
+       envoi du signal ImageExtractedSig à la barre de progression.
+       Les frames sont converties en RGB directement dans le fichier.'''
+
+    # Définition de 2 signaux associés à un paramètre entier (n° image) :
+    ImageExtractedSig = pyqtSignal(int)
+    ImageProblemSig   = pyqtSignal(int)
+
+    def __init__(self, videoCapture, imageDir, first_last_step=(1, None, 1),
+                 roi_scale=(None, 1), nbVideoFrames=None):
+        super().__init__()
+        self.__video = videoCapture      # l'objet openCV.VideoCapture
+        self.__imDir = imageDir           # le répertoire où écrire le fichier
+        self.__first_last_step = first_last_step # frames à garder
+        self.__roi_scale = roi_scale      # recadrage et facteur de réduction
+        # nombre exact de frames de la vidéo (index des frames), sinon None :
+        # CAP_PROP_FRAME_COUNT n'est qu'une estimation
+        self.__nbVideoFrames = nbVideoFrames
+        self.__complete = False           # toutes les frames lues écrites ?
+
+    def is_complete(self):
+        '''True si le découpage est allé à son terme et que toutes les
+           frames lues ont trouvé place dans le fichier.'''
+        return self.__complete
+
+    def run(self):
+        if not self.__video.isOpened():
+            print("Some problem occured...")
+            return
+
+        nbVideoFrames = self.__nbVideoFrames or \
+                        int(self.__video.get(cv2.CAP_PROP_FRAME_COUNT))
+        nframes = nb_frames_in_range(nbVideoFrames, *self.__first_last_step)
+        width, height = ingest_size(int(self.__video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                    int(self.__video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                    *self.__roi_scale)
+        # fichier préalloué avec le nombre de frames annoncé, le nombre de
+        # frames réellement lues est écrit dans l'en-tête :
+        cube = np.lib.format.open_memmap(self.__imDir + FrameCube.cube_name,
+                                         mode='w+', dtype=np.uint8,
+                                         shape=(nframes, height, width, 3))
+        i, fingerprints, truncated = 0, {}, False
+        for _, frame in read_frames(self.__video, *self.__first_last_step,
+                                    *self.__roi_scale):
+            if self.isInterruptionRequested(): break
+            if i >= nframes:
+                # la vidéo a plus de frames qu'annoncé : découpage incomplet
+                print("Plus de {} frames dans la vidéo : fichier des frames "
+                      "incomplet".format(nframes))
+                self.ImageProblemSig.emit(-(i+1))
+                truncated = True
+                break
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=cube[i])
+            i += 1
+            fingerprints[i] = frame_fingerprint(frame)
+            self.ImageExtractedSig.emit(i)
+        cube.flush()
+        del cube
+        save_fingerprints(self.__imDir, fingerprints)
+        FrameCube.write_header(self.__imDir, i, width, height)
+        self.__complete = not self.isInterruptionRequested() and \
+                          not truncated and i > 0
+
+def split_video_segment(video_path, imageDir, imagesFormat, compression,
+                        first, last, step, roi, factor, rank, queue):
+    '''Écrit les frames <first>, <first>+step, ... <= <last> (None : jusqu'à
+       la fin) de la vidéo, recadrées et réduites, numérotées à partir de <rank>.
+       Fonction exécutée dans un processus fils : chaque image écrite est
+       signalée par son n° et son empreinte dans <queue> (une image non
+       écrite n'est pas signalée), la fin du segment par None.'''
+    video = cv2.VideoCapture(video_path)
+    i = rank
+    for _, frame in read_frames(video, first, last, step, roi, factor):
+        if cv2.imwrite(imageDir + imagesFormat.format(i), frame,
+                       [cv2.IMWRITE_PNG_COMPRESSION, compression]):
+            queue.put((i, frame_fingerprint(frame)))
+        i += 1
+    video.release()
+    queue.put(None)
+
+class SplitVideoInSegmentsThread(QThread):
+    '''Thread chargé de l'extraction des images par plusieurs processus :
+       la vidéo est coupée en <nbProcess> segments de frames consécutives,
+       chaque processus ouvre la vidéo, se positionne au début de son segment
+       et écrit ses images. Les noms des images sont les mêmes qu'avec
+       SplitVideoInImagesThread.'''
+
+    # Définition de 2 signaux associés à un paramètre entier :
+    ImageExtractedSig = pyqtSignal(int)  # nombre d'images écrites
+    ImageProblemSig   = pyqtSignal(int)
+
+    def __init__(self, videoPath, imageDir, imagesFormat, nbProcess,
+                 compression=1, first_last_step=(1, None, 1),
+                 roi_scale=(None, 1)):
+        super().__init__()
+        self.__videoPath = videoPath          # le chemin du fichier vidéo
+        self.__imDir = imageDir               # le répertoire où écrire les images
+        self.__fileNameFormat = imagesFormat  # le format des noms d'images
+        self.__compression = compression      # niveau de compression PNG (0 à 9)
+        self.__nbProcess = nbProcess          # le nombre de processus
+        self.__first_last_step = first_last_step # frames à garder
+        self.__roi_scale = roi_scale          # recadrage et facteur de réduction
+        self.__complete = False               # toutes les frames lues écrites ?
+
+    def is_complete(self):
+        '''True si tous les segments sont allés à leur terme et que les
+           images écrites, au moins une, sont bien numérotées de 1 à leur
+           nombre.'''
+        return self.__complete
+
+    def run(self):
+        video = cv2.VideoCapture(self.__videoPath)
+        if not video.isOpened():
             print("Some problem occured...")
-            
+            return
+        first, last, step = self.__first_last_step
+        nframes = nb_frames_in_range(int(video.get(cv2.CAP_PROP_FRAME_COUNT)),
+                                     first, last, step)
+        video.release()
+
+        # bornes des segments en rang d'image gardée, le dernier segment va
+        # jusqu'à <last> ou jusqu'à la fin de la vidéo car CAP_PROP_FRAME_COUNT
+        # n'est qu'une estimation :
+        nbProcess = max(1, min(self.__nbProcess, nframes))
+        bounds = [1 + k*nframes//nbProcess for k in range(nbProcess+1)]
+
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        workers = []
+        for k in range(nbProcess):
+            seg_first = first + (bounds[k]-1)*step
+            seg_last  = first + (bounds[k+1]-2)*step if k < nbProcess-1 else last
+            worker = context.Process(target=split_video_segment,
+                                     args=(self.__videoPath, self.__imDir,
+                                           self.__fileNameFormat,
+                                           self.__compression,
+                                           seg_first, seg_last, step,
+                                           *self.__roi_scale,
+                                           bounds[k], queue))
+            worker.start()
+            workers.append(worker)
+
+        nbDone, nbImages, fingerprints = 0, 0, {}
+        while nbDone < nbProcess:
+            if self.isInterruptionRequested():
+                for worker in workers: worker.terminate()
+                break
+            try:
+                item = queue.get(timeout=0.1)
+            except Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    print("Some problem occured...")
+                    self.ImageProblemSig.emit(-nbImages)
+                    break
+                continue
+            if item is None:
+                nbDone += 1
+            else:
+                i, fingerprints[i] = item
+                nbImages += 1
+                # émettre le signal ImageExtractedSig avec le nombre d'images
+                # écrites pour faire avancer la barre de progression :
+                self.ImageExtractedSig.emit(nbImages)
+
+        for worker in workers: worker.join()
+        save_fingerprints(self.__imDir, fingerprints)
+        self.__complete = nbDone == nbProcess and nbImages > 0 and \
+                          not self.isInterruptionRequested() and \
+                          sorted(fingerprints) == list(range(1, nbImages+1))
+
+class TargetsPositions:
+    '''Positions (X, Y) des cibles, image par image. Une cible non trouvée
+       dans une image garde sa position précédente ; une image est en
+       problème tant qu'une des cibles n'a pas encore de position connue.'''
+
+    def __init__(self, nb_targets):
+        self.listesX = [[] for _ in range(nb_targets)]
+        self.listesY = [[] for _ in range(nb_targets)]
+        self.listeI  = []
+        self.__last  = [None]*nb_targets  # dernière position de chaque cible
+
+    def add(self, index, centers):
+        '''Ajoute les <centers> des cibles dans l'image de rang <index>.
+           Renvoie False si l'image est en problème.'''
+        for num, center in enumerate(centers):
+            if center is not None: self.__last[num] = center
+        if any(last is None for last in self.__last): return False
+        for num, (x, y) in enumerate(self.__last):
+            self.listesX[num].append(x)
+            self.listesY[num].append(y)
+        self.listeI.append(index)
+        return True
+
+    def fill(self, target_pos):
+        '''Ajoute à <target_pos> les listes [X, Y, n° image] de chaque cible.'''
+        target_pos.extend([[listeX, listeY, self.listeI]
+                           for listeX, listeY in zip(self.listesX, self.listesY)])
+
+
 class ExtractTargetFomImagesThread(QThread):
     '''Thread chargé de l'extraction de la cible colorée dans les images,
        avec envoi du signal TargetExtractedSig pour la progression de la
-       barre et du dignal ExtractTargetProblemSig en cas de problème.'''
+       barre et du dignal ExtractTargetProblemSig en cas de problème.
+       Les images sont lues dans un objet source (cf. FrameSource) : fichiers
+       PNG d'un dossier ou frames lues directement dans la vidéo.
+       Une image dont l'empreinte est celle de l'image précédente n'est pas
+       retraitée : on reprend le centre trouvé dans l'image précédente.'''
 
     # Définition de 2 signaux associés à un paramètre entier (n° image) :
     TargetExtractedSig = pyqtSignal(int)
     TargetProblemSig   = pyqtSignal(int)
+    # Signal du bilan des images identiques non retraitées :
+    ReportSig          = pyqtSignal(str)
 
     def __init__(self,
-                 images_dir,       # directory of images to process
-                 images_list,      # list of images files name
-                 target_RGB,       # RGB color of ther target to extract
+                 frame_source,     # source of the images to process
+                 targets_RGB,      # RGB colors (or ColorClassifier) of the targets
                  algo,             # algorithm to use
                  marge_couleur,    # epsilon to use for color
-                 target_pos,       # row, columns, image_indexliste of the target center
-                 first_last_step): # first and last image to process and the step
+                 target_pos,       # row, columns, image_indexliste of each target center
+                 first_last_step,  # first and last image to process and the step
+                 predict=False,    # search the target in a predicted window
+                 pyramid=None,     # (factor, tolerance) of a coarse-to-fine search
+                 frame_stats=None): # dict filled with the statistics of the frames
 
         super().__init__()
         
-        self.__images_dir    = images_dir
-        self.__images_list   = images_list
-        self.__target_RGB    = target_RGB
+        self.__source        = frame_source
+        self.__targets_RGB   = target_list(targets_RGB)
         self.__algo          = algo
         self.__epsilon       = marge_couleur
         self.__target_pos    = target_pos
         self.__first_last_step = first_last_step
+        self.__predict       = predict
+        self.__pyramid       = pyramid
+        self.__frame_stats   = frame_stats
+        self.__full_frame    = False  # statistiques de toute l'image ?
+
+    def full_frame_stats(self):
+        '''True si les statistiques rangées dans <frame_stats> ont toutes
+           été calculées sur toute l'image (cf. full_frame_stats).'''
+        return self.__full_frame
 
     def run(self):
         #### <à compléter>
         #### pour remplir liste target_pos avec les 2 listes listeX et listeY
         #### des coordonnées (X,Y) du centre cible dans chaque image.
 
-        print("Calcul du centre cible dans les images avec l'algorithme '{}'"\
-              .format(self.__algo))
+        print("Calcul du centre cible dans les images avec l'algorithme '{}', "
+              "noyau {}".format(self.__algo, detection_kernel().name))
 
-        r,g,b = self.__target_RGB # les couleurs à rechercher
-        listeX, listeY, listeI = [], [], []
+        positions = TargetsPositions(len(self.__targets_RGB))
+        # toutes les cibles sont cherchées dans chaque image lue, les images
+        # identiques à la précédente ne sont pas retraitées :
+        tracker = FrameTracker(self.__source, self.__targets_RGB,
+                               self.__epsilon, self.__algo, self.__predict,
+                               self.__pyramid)
 
         # Parcourir les images à la recherche des pixels
         first, last, step = self.__first_last_step
+        for target in self.__targets_RGB:
+            if isinstance(target, MotionDetector):
+                target.learn_background(self.__source, range(first, last+1, step))
         for index in range(first, last+1, step):
-            image = self.__images_list[index-1]
-            path = self.__images_dir + image
+            if self.isInterruptionRequested(): break
             try :
-                pixelsTab = imread(path)
-                tab_bool = (abs(pixelsTab[:,:,0]-r) <= self.__epsilon)* \
-                           (abs(pixelsTab[:,:,1]-g) <= self.__epsilon)* \
-                           (abs(pixelsTab[:,:,2]-b) <= self.__epsilon)*1
-                Y,X = np.array(np.nonzero(tab_bool))
-
-                if X.size != 0 and Y.size != 0:
-                    # Calcul du centre en fonction de l'algorithme:
-                    if self.__algo == 'barycentre':
-                        x, y = X.mean(), Y.mean()
-                    elif self.__algo == 'minmax':
-                        x, y = (X.min()+X.max())/2, (Y.min()+Y.max())/2
-                        
-                listeX.append(x)
-                listeY.append(y)
-                listeI.append(index)
+                stats = tracker.stats(index)
+                if self.__frame_stats is not None:
+                    self.__frame_stats[index] = stats
+                if not positions.add(index, centers_from_stats(stats, self.__algo)):
+                    raise Exception("position inconnue")
                 # émettre le signal TargetExtractedSig avec le n° d'image
                 # pour faire avancer la barre de progression connectée à
                 # ce signal :
                 self.TargetExtractedSig.emit(index)
             except :
-                print("erreur extraction cible, image {}...".format(image))
+                print("erreur extraction cible, image {}...".format(index))
                 # émettre le signal ImageProblemSig, avec le n° de l'image à PB
                 self.TargetProblemSig.emit(-index)
+        self.__source.close()
+
+        self.__full_frame = full_frame_stats(tracker.counters)
+
+        reports = [tracker.report()] + [target.report() for target in self.__targets_RGB
+                                        if isinstance(target, TemplateTracker)]
+        report = "\n".join(report for report in reports if report is not None)
+        if report:
+            print(report)
+            self.ReportSig.emit(report)
 
         # Mettre à jour la liste target_pos :
-        self.__target_pos.extend([listeX, listeY, listeI])
+        positions.fill(self.__target_pos)
+
+
+class ExtractTargetSharedMemoryThread(QThread):
+    '''Thread chargé de l'extraction de la cible colorée directement dans les
+       frames de la vidéo avec plusieurs processus (cf. ParallelTracking) :
+       un processus décode la vidéo dans un anneau de slots en mémoire
+       partagée, <nbProcess> processus y cherchent la cible. Les résultats
+       sont remis dans l'ordre des frames.'''
+
+    # Définition de 2 signaux associés à un paramètre entier (n° image) :
+    TargetExtractedSig = pyqtSignal(int)
+    TargetProblemSig   = pyqtSignal(int)
+    ReportSig          = pyqtSignal(str)
+
+    def __init__(self,
+                 videoPath,        # the video file
+                 roi_scale,        # region kept and downscale factor
+                 targets_RGB,      # RGB colors (or ColorClassifier) of the targets
+                 algo,             # algorithm to use
+                 marge_couleur,    # epsilon to use for color
+                 target_pos,       # row, columns, image_indexliste of each target center
+                 first_last_step,  # first and last image to process and the step
+                 nbProcess=None,   # number of tracking processes
+                 pyramid=None,     # (factor, tolerance) of a coarse-to-fine search
+                 frame_stats=None): # dict filled with the statistics of the frames
+
+        super().__init__()
+
+        self.__videoPath     = videoPath
+        self.__roi_scale     = roi_scale
+        self.__targets_RGB   = target_list(targets_RGB)
+        self.__algo          = algo
+        self.__epsilon       = marge_couleur
+        self.__target_pos    = target_pos
+        self.__first_last_step = first_last_step
+        self.__nbProcess     = nbProcess
+        self.__pyramid       = pyramid
+        self.__frame_stats   = frame_stats
+        self.__full_frame    = False  # statistiques de toute l'image ?
 
+    def full_frame_stats(self):
+        '''True si les statistiques rangées dans <frame_stats> ont toutes
+           été calculées sur toute l'image (cf. full_frame_stats).'''
+        return self.__full_frame
+
+    def run(self):
+        # le noyau est choisi ici une fois, avant les processus de suivi :
+        print("Calcul du centre cible dans les frames avec l'algorithme '{}' "
+              "(mémoire partagée), noyau {}".format(self.__algo,
+                                                    detection_kernel().name))
+
+        positions = TargetsPositions(len(self.__targets_RGB))
+        index = self.__first_last_step[0]
+        counters = {}  # recherches à basse résolution des processus
+
+        frames = track_video(self.__videoPath, self.__targets_RGB,
+                             self.__epsilon,
+                             self.__first_last_step, self.__roi_scale,
+                             self.__nbProcess, self.__pyramid, self.__algo,
+                             counters)
+        try:
+            for index, stats in frames:
+                if self.isInterruptionRequested(): break
+                if self.__frame_stats is not None:
+                    self.__frame_stats[index] = stats
+                if not positions.add(index, centers_from_stats(stats, self.__algo)):
+                    # pas encore de position connue pour une cible :
+                    print("erreur extraction cible, image {}...".format(index))
+                    self.TargetProblemSig.emit(-index)
+                    continue
+                self.TargetExtractedSig.emit(index)
+        except Exception as e:
+            print("erreur extraction cible :", e)
+            self.TargetProblemSig.emit(-index)
+        finally:
+            # arrête les processus si la boucle a été interrompue :
+            frames.close()
+
+        self.__full_frame = full_frame_stats(counters)
+
+        report = tracking_report(counters)
+        if report is not None:
+            print(report)
+            self.ReportSig.emit(report)
+
+        # Mettre à jour la liste target_pos :
+        positions.fill(self.__target_pos)
+
+
+class ExtractTargetFromBatchesThread(QThread):
+    '''Thread chargé de l'extraction de la cible colorée dans les images avec
+       un pool de processus (cf. ParallelTracking.track_batches) : les rangs
+       des images sont coupés en lots traités en parallèle, chaque processus
+       ayant sa propre source d'images. Les résultats sont remis dans l'ordre
+       des images avant de remplir target_pos.'''
+
+    # Définition de 2 signaux associés à un paramètre entier (n° image) :
+    TargetExtractedSig = pyqtSignal(int)
+    TargetProblemSig   = pyqtSignal(int)
+    # Signal du bilan des images identiques non retraitées :
+    ReportSig          = pyqtSignal(str)
+
+    def __init__(self,
+                 frame_source,     # source of the images to process
+                 targets_RGB,      # RGB colors (or ColorClassifier) of the targets
+                 algo,             # algorithm to use
+                 marge_couleur,    # epsilon to use for color
+                 target_pos,       # row, columns, image_indexliste of each target center
+                 first_last_step,  # first and last image to process and the step
+                 nbProcess=None,   # number of processes of the pool
+                 predict=False,    # search the target in a predicted window
+                 pyramid=None,     # (factor, tolerance) of a coarse-to-fine search
+                 frame_stats=None): # dict filled with the statistics of the frames
+
+        super().__init__()
+
+        self.__source        = frame_source
+        self.__targets_RGB   = target_list(targets_RGB)
+        self.__algo          = algo
+        self.__epsilon       = marge_couleur
+        self.__target_pos    = target_pos
+        self.__first_last_step = first_last_step
+        self.__nbProcess     = nbProcess
+        self.__predict       = predict
+        self.__pyramid       = pyramid
+        self.__frame_stats   = frame_stats
+        self.__full_frame    = False  # statistiques de toute l'image ?
+
+    def full_frame_stats(self):
+        '''True si les statistiques rangées dans <frame_stats> ont toutes
+           été calculées sur toute l'image (cf. full_frame_stats).'''
+        return self.__full_frame
+
+    def run(self):
+        # le noyau est choisi ici une fois, avant les processus du pool :
+        print("Calcul du centre cible dans les images avec l'algorithme '{}' "
+              "(pool de processus), noyau {}".format(self.__algo,
+                                                     detection_kernel().name))
+
+        positions = TargetsPositions(len(self.__targets_RGB))
+        counters = None  # compteurs des FrameTracker des processus
+
+        first, last, step = self.__first_last_step
+        batches = track_batches(self.__source, range(first, last+1, step),
+                                self.__targets_RGB, self.__epsilon, self.__algo,
+                                self.__nbProcess, predict=self.__predict,
+                                pyramid=self.__pyramid)
+        try:
+            for results, batch_counters in batches:
+                if self.isInterruptionRequested(): break
+                for index, stats, error in results:
+                    if error is None and self.__frame_stats is not None:
+                        self.__frame_stats[index] = stats
+                    if error is not None or \
+                       not positions.add(index, centers_from_stats(stats, self.__algo)):
+                        print("erreur extraction cible, image {}...".format(index))
+                        self.TargetProblemSig.emit(-index)
+                if counters is None:
+                    counters = batch_counters
+                else:
+                    for key in counters: counters[key] += batch_counters[key]
+                # le lot est fini : faire avancer la barre de progression
+                self.TargetExtractedSig.emit(results[-1][0])
+        finally:
+            # arrête le pool si la boucle a été interrompue :
+            batches.close()
+        self.__source.close()
+
+        self.__full_frame = counters is not None and full_frame_stats(counters)
+
+        report = tracking_report(counters) if counters is not None else None
+        if report is not None:
+            print(report)
+            self.ReportSig.emit(report)
+
+        # Mettre à jour la liste target_pos :
+        positions.fill(self.__target_pos)
+
+
+class EpsilonSweepThread(QThread):
+    '''Thread du balayage d'epsilon : pour chaque image, les statistiques
+       des masques de chaque cible pour tous les epsilon de 0 à
+       <max_epsilon> (cf. epsilon_sweep) sont rangées dans le dictionnaire
+       <sweep> (rang -> liste des tableaux des cibles). Un epsilon est
+       ensuite choisi sans relire les images.'''
+
+    TargetExtractedSig = pyqtSignal(int)
+    TargetProblemSig   = pyqtSignal(int)
+
+    def __init__(self, frame_source, targets_RGB, max_epsilon,
+                 first_last_step, sweep):
+
+        super().__init__()
+
+        self.__source          = frame_source
+        self.__targets_RGB     = target_list(targets_RGB)
+        self.__max_epsilon     = max_epsilon
+        self.__first_last_step = first_last_step
+        self.__sweep           = sweep
+        self.__complete        = False  # toutes les images balayées ?
+
+    def is_complete(self):
+        '''True si le balayage n'a pas été interrompu et qu'aucune image n'a
+           provoqué d'erreur : <sweep> couvre alors toutes les images.'''
+        return self.__complete
+
+    def run(self):
+        print("Balayage d'epsilon de 0 à {}".format(self.__max_epsilon))
+        t0 = time.time()
+        first, last, step = self.__first_last_step
+        complete = True
+        for index in range(first, last+1, step):
+            if self.isInterruptionRequested():
+                complete = False
+                break
+            try:
+                pixelsTab = self.__source.read(index)
+                self.__sweep[index] = [epsilon_sweep(pixelsTab, target_RGB,
+                                                     self.__max_epsilon)
+                                       for target_RGB in self.__targets_RGB]
+                self.TargetExtractedSig.emit(index)
+            except Exception:
+                print("erreur balayage epsilon, image {}...".format(index))
+                self.TargetProblemSig.emit(-index)
+                complete = False
+        self.__source.close()
+        self.__complete = complete
+        print("Balayage d'epsilon : {:.2f} s".format(time.time()-t0))
+
+class ProxyFramesThread(QThread):
+    '''Thread qui prépare en tâche de fond les versions réduites (proxies)
+       des frames, utilisées pour naviguer dans les images sans charger les
+       images en pleine résolution. Chaque proxy est rangé, encodé en JPEG,
+       dans le dictionnaire <proxies> sous le rang de sa frame.'''
+
+    # Signal associé au rang de la frame dont le proxy est prêt :
+    ProxyReadySig = pyqtSignal(int)
+
+    def __init__(self, frame_source, factor, proxies):
+
+        super().__init__()
+
+        self.__source  = frame_source  # source propre au thread
+        self.__factor  = factor        # facteur de réduction des proxies
+        self.__proxies = proxies       # dictionnaire rang -> JPEG
+
+    def run(self):
+        f = self.__factor
+        for index in range(1, self.__source.nb_frames+1):
+            if self.isInterruptionRequested(): break
+            try:
+                frame = self.__source.read(index)
+            except Exception:
+                print("erreur proxy, image {}...".format(index))
+                break
+            height, width = frame.shape[:2]
+            small = cv2.resize(frame, (width//f, height//f),
+                               interpolation=cv2.INTER_AREA)
+            ret, data = cv2.imencode(".jpg", cv2.cvtColor(small, cv2.COLOR_RGB2BGR),
+                                     [cv2.IMWRITE_JPEG_QUALITY, 90])
+            if not ret: break
+            self.__proxies[index] = data.tobytes()
+            self.ProxyReadySig.emit(index)
+        self.__source.close()
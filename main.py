@@ -15,13 +15,31 @@
 # version 1.7 -- 2021-04-28 -- JLC -- 
 #   Fix bug: data in exported CSV file are not scaled.
 #
+# version 1.8 -- 2026-10-18 --
+#   add option to track the target directly in the video frames.
+#   add option to split the video with several processes.
+#   add PNG compression level option.
+#   add option to store the frames in a memory-mapped .npy file.
+#   add option to choose the range of frames to split.
+#   the time of the frames comes from the frame index of the video.
+#   add option to track the target in the video frames with several processes.
+#   stop the background work of the image tab when the window is closed.
+#   add option to search the target around its predicted position.
+#   several targets of different colors: targets_pos, targets_RGB and the
+#   current target selected by select_target, one pair of columns per target
+#   in the CSV files.
+#   add option to search the target coarse-to-fine, with its tolerance.
+#   add option to preview the mask of the target on the displayed image.
+#   add replot: only the displayed plot tab is redrawn, the others when shown.
+#
 
 import numpy as np
 import os, sys, platform
 import pandas
 
 from PyQt5.Qt import (QApplication, QFileDialog, QMainWindow, QMessageBox,
-                      QDesktopWidget, QTabWidget, QAction, QIcon, QPixmap)
+                      QDesktopWidget, QTabWidget, QAction, QActionGroup,
+                      QIcon, QPixmap)
 
 from ImageWidget import ImageDisplay
 from PlotWidget import OnePlot, TwoPlots
@@ -68,17 +86,37 @@ class VideoTracker(QMainWindow):
         #  displayInfo   -> display or non information windows
         #  autoClearTraj -> automatically clear trajectory plot before a new plot
         #  drawTargetSelection -> draw/not draw the selected color area
+        #  streamVideo   -> read the frames directly in the video (no PNG files)
+        #  parallelSplit -> split the video with one process per CPU core
+        #  frameCube     -> store the frames in one memory-mapped .npy file
+        #  splitRange    -> ask the first/last/step frames before splitting
+        #  parallelTracking -> track the target with several processes
+        #  predictiveWindow -> search the target around its predicted position
+        #  maskPreview   -> overlay the target mask and center on the image
         
         self.flags = {"debug":          False,
                       "displayInfo":    True,
                       "autoClearTraj":  True,
-                      "drawTargetSelection": True}
+                      "drawTargetSelection": True,
+                      "streamVideo":    False,
+                      "parallelSplit":  False,
+                      "frameCube":      False,
+                      "splitRange":     False,
+                      "parallelTracking": False,
+                      "predictiveWindow": False,
+                      "maskPreview":    True}
         self.csv_dataFrame  = None # Data 
         self.__target_pos   = None # target positions x, y
         self.__target_veloc = None # target velocities x, y
         self.__target_accel = None # target accelerations x, y
         self.target_RGB     = None # color plor drawing plots
+        self.targets_pos    = None # positions x, y, image of all the targets
+        self.targets_RGB    = None # colors of all the targets
+        self.target_num     = 0    # rank of the current target
         self.unit_dict      = None
+        self.png_compression = 1   # PNG compression level (0..9) of split images
+        self.pyramid_factor  = 1   # subsampling of the coarse search (1: none)
+        self.pyramid_tolerance = 0.5 # distance [pixel] to the full-frame center, checked on some searches
             
         self.__initUI()   # User Interface initialisation
         self.show()       # Display this window
@@ -109,6 +147,26 @@ class VideoTracker(QMainWindow):
             raise Exception("target_accel should be a numpy.ndarray object !")
         self.__target_accel = data
 
+    def set_targets(self, targets_pos, targets_RGB):
+        '''Positions (tableau (ncibles, 3, N)) et couleurs (tableau
+           (ncibles, 3)) des cibles suivies ; la première devient la cible
+           courante.'''
+        self.targets_pos = targets_pos
+        self.targets_RGB = targets_RGB
+        self.select_target(0)
+
+    def select_target(self, num):
+        '''La cible <num> devient la cible courante (target_pos, target_RGB).'''
+        self.target_num = num
+        self.target_pos = self.targets_pos[num]
+        self.target_RGB = self.targets_RGB[num]
+
+    def targets(self):
+        '''Liste des couples (positions, couleur) des cibles suivies.'''
+        if self.targets_pos is None:
+            return [(self.target_pos, self.target_RGB)]
+        return list(zip(self.targets_pos, self.targets_RGB))
+
     def center(self):
         '''To center the current window in the current display'''
         desktop = QApplication.desktop()
@@ -126,6 +184,7 @@ class VideoTracker(QMainWindow):
 
         # QTabWidget of the application showing the 5 tabs
         self.tabs = QTabWidget()
+        self.__stale_plots = set()  # onglets de tracé à retracer à l'affichage
         # tab1: display video images & video metadata
         self.imageTab = ImageDisplay(self)
         # tab2: plot (y(t), x(t))
@@ -148,6 +207,7 @@ class VideoTracker(QMainWindow):
         self.tabs.addTab(self.twoPlots_AxAy,"Accelerations")
         self.tabs.addTab(self.functionOfXY,"Drawing tool")
         self.tabs.addTab(self.pythonConsole,"IPython")
+        self.tabs.currentChanged.connect(self.__tab_changed)
         self.setCentralWidget(self.tabs)
 
         # Menu(s)
@@ -243,12 +303,152 @@ class VideoTracker(QMainWindow):
         qa.triggered.connect(lambda e: self.set_flag("drawTargetSelection", e))
         optionMenu.addAction(qa)
 
+        ### read the video frames directly, without splitting in PNG files:
+        qa = QAction('Traitement direct de la vidéo (sans images)',
+                                self, checkable=True)
+        text  = 'Lire les frames directement dans la vidéo au lieu de la '
+        text += 'découper en fichiers images'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(False)
+        qa.triggered.connect(lambda e: self.set_flag("streamVideo", e))
+        optionMenu.addAction(qa)
+
+        ### split the video with several processes:
+        qa = QAction('Découpage de la vidéo multi-processus',
+                                self, checkable=True)
+        text  = 'Découper la vidéo en segments traités en parallèle, '
+        text += 'un processus par coeur'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(self.flags["parallelSplit"])
+        qa.triggered.connect(lambda e: self.set_flag("parallelSplit", e))
+        optionMenu.addAction(qa)
+
+        ### store the frames in one memory-mapped file:
+        qa = QAction('Stocker les images dans un fichier .npy',
+                                self, checkable=True)
+        text  = 'Ranger toutes les frames dans un seul fichier en mémoire '
+        text += 'mappée au lieu de fichiers PNG'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(False)
+        qa.triggered.connect(lambda e: self.set_flag("frameCube", e))
+        optionMenu.addAction(qa)
+
+        ### choose the frames to split:
+        qa = QAction('Choisir les frames à découper',
+                                self, checkable=True)
+        text  = 'Demander la première frame, la dernière et le pas avant '
+        text += 'de découper la vidéo'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(False)
+        qa.triggered.connect(lambda e: self.set_flag("splitRange", e))
+        optionMenu.addAction(qa)
+
+        ### track the target with several processes:
+        qa = QAction('Extraction de la trajectoire multi-processus',
+                                self, checkable=True)
+        text  = 'Chercher la cible avec un processus par coeur : frames de la '
+        text += 'vidéo en mémoire partagée, ou lots d\'images découpées'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(False)
+        qa.triggered.connect(lambda e: self.set_flag("parallelTracking", e))
+        optionMenu.addAction(qa)
+
+        ### search the target around its predicted position:
+        qa = QAction('Fenêtre de recherche prédite',
+                                self, checkable=True)
+        text  = 'Chercher la cible autour de la position prédite à partir des '
+        text += 'images précédentes, puis dans toute l\'image si elle n\'y est pas'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(False)
+        qa.triggered.connect(lambda e: self.set_flag("predictiveWindow", e))
+        optionMenu.addAction(qa)
+
+        ### preview of the target mask on the displayed image:
+        qa = QAction('Aperçu du masque de la cible',
+                                self, checkable=True)
+        text  = 'Afficher sur l\'image les pixels de la couleur de la cible et '
+        text += 'son centre, mis à jour avec epsilon et la sélection'
+        qa.setStatusTip(text)  # message in the status bar
+        qa.setChecked(True)
+        qa.triggered.connect(lambda e: self.set_flag("maskPreview", e))
+        qa.triggered.connect(lambda e: self.imageTab.update_preview())
+        optionMenu.addAction(qa)
+
+        ### PNG compression level of the split images:
+        compressionMenu = optionMenu.addMenu('Compression PNG des images')
+        group = QActionGroup(self)
+        for level in range(10):
+            qa = QAction(str(level), self, checkable=True)
+            text  = 'Niveau de compression des images PNG : de 0 (rapide, '
+            text += 'fichiers gros) à 9 (lent, fichiers petits)'
+            qa.setStatusTip(text)  # message in the status bar
+            qa.setChecked(level == self.png_compression)
+            qa.triggered.connect(lambda e, level=level: self.set_png_compression(level))
+            group.addAction(qa)
+            compressionMenu.addAction(qa)
+
+        ### coarse-to-fine search of the target:
+        pyramidMenu = optionMenu.addMenu('Recherche grossière puis fine')
+        group = QActionGroup(self)
+        for factor in (1, 4, 8):
+            qa = QAction('non' if factor == 1 else 'image réduite {}x'.format(factor),
+                         self, checkable=True)
+            text  = 'Chercher la cible dans l\'image sous-échantillonnée, puis '
+            text += 'calculer son centre en pleine résolution autour d\'elle'
+            qa.setStatusTip(text)  # message in the status bar
+            qa.setChecked(factor == self.pyramid_factor)
+            qa.triggered.connect(lambda e, factor=factor: self.set_pyramid(factor=factor))
+            group.addAction(qa)
+            pyramidMenu.addAction(qa)
+        pyramidMenu.addSeparator()
+        group = QActionGroup(self)
+        for tolerance in (0.1, 0.25, 0.5, 1.):
+            qa = QAction('tolérance {} pixel'.format(tolerance), self, checkable=True)
+            text  = 'Écart au centre calculé sur toute l\'image au-delà duquel '
+            text += 'celui-ci est gardé, contrôlé sur une partie des recherches seulement'
+            qa.setStatusTip(text)  # message in the status bar
+            qa.setChecked(tolerance == self.pyramid_tolerance)
+            qa.triggered.connect(lambda e, tolerance=tolerance:
+                                 self.set_pyramid(tolerance=tolerance))
+            group.addAction(qa)
+            pyramidMenu.addAction(qa)
+
+    def closeEvent(self, event):
+        # arrêter le calcul des proxies en tâche de fond :
+        self.imageTab.stop_proxies()
+        event.accept()
+
     def set_flag(self, flag, state):
         if self.flags["debug"]: print("{} -> {}".format(flag, state))
         self.flags[flag] = state
         if self.flags["debug"]: print("set_flag: {} -> {}".format(flag, self.flags[flag]))
 
+    def set_png_compression(self, level):
+        if self.flags["debug"]: print("png_compression -> {}".format(level))
+        self.png_compression = level
+
+    def set_pyramid(self, factor=None, tolerance=None):
+        if factor is not None: self.pyramid_factor = factor
+        if tolerance is not None: self.pyramid_tolerance = tolerance
+        if self.flags["debug"]:
+            print("pyramid -> {}, {}".format(self.pyramid_factor, self.pyramid_tolerance))
+
+    def replot(self):
+        '''Retrace les courbes de l'onglet affiché ; les autres onglets de
+           tracé ne sont retracés que quand ils sont affichés.'''
+        self.__stale_plots = {self.onePlot, self.twoPlots_xy,
+                              self.twoPlots_VxVy, self.twoPlots_AxAy}
+        self.__tab_changed(self.tabs.currentIndex())
+
+    def __tab_changed(self, index):
+        plot = self.tabs.widget(index)
+        if plot in self.__stale_plots:
+            self.__stale_plots.discard(plot)
+            plot.ClearAxes()
+            plot.Plot()
+
     def clearPlots(self):
+        self.__stale_plots = set()
         self.onePlot.ClearAxes()
         self.twoPlots_xy.ClearAxes()
         self.twoPlots_VxVy.ClearAxes()
@@ -279,6 +479,7 @@ class VideoTracker(QMainWindow):
         self.clearPlots()
         
         # Extract the meta-data dictionary and fill the field in the Image display:
+        self.imageTab.frame_index = None
         exec("self.imageTab.dico_video="+data[1].split('#')[1].strip())
         self.imageTab.parse_meta_data()
         self.imageTab.setTextInfoVideoGrid()
@@ -307,11 +508,12 @@ class VideoTracker(QMainWindow):
               'self.imageTab.btn_algo.currentText():',
               self.imageTab.btn_algo.currentText())
             
-        # Extract RGB target color:
+        # Extract RGB target color (one line of colors for several targets):
         RGB = data[4].split('#')[1].strip()
         print("self.target_RGB=np."+RGB)
         try:
             exec("self.target_RGB=np."+RGB)
+            targets_RGB = np.atleast_2d(self.target_RGB)
         except:
             rep = QMessageBox.critical(
             None,        # QMessageBox parent widget
@@ -325,13 +527,16 @@ class VideoTracker(QMainWindow):
                                              delimiter=';',
                                              encoding="utf8")
         data = self.csv_dataFrame.values
-        data = [data[:,1], data[:,2], data[:,3]]
-        self.target_pos = np.array(data)        
+        # columns T, X1, Y1, X2, Y2..., num image:
+        data = [[data[:,1+2*k], data[:,2+2*k], data[:,-1]]
+                for k in range(len(targets_RGB))]
+        self.set_targets(np.array(data), targets_RGB)
         self.imageTab.display_plots()
 
         # Clear display tab:
         self.imageTab.btn_algo.clear()
         self.imageTab.buttonsState(importCSV=True)
+        self.imageTab.update_target_choice()
         self.imageTab.img_lbl.setPixmap(QPixmap())
         
         self.twoPlots_VxVy.reset()
@@ -354,9 +559,8 @@ class VideoTracker(QMainWindow):
         if fname[0] == "": return 
 
         nbImages = len(self.__target_pos[0])
-        if self.imageTab.video_FPS is not None:
-            deltaT = 1./self.imageTab.video_FPS
-            time = np.arange(nbImages)*deltaT
+        time = self.imageTab.frame_times(self.__target_pos[2])
+        if time is not None:
             tlabel, tformat = "T [seconde]", "%10.6e"
         else:
             time = range(1, nbImages+1)
@@ -379,13 +583,24 @@ class VideoTracker(QMainWindow):
         header += str(self.imageTab.dico_video)+"\n"
         header += str(unit_dict)+"\n"
         header += self.imageTab.btn_algo.currentText()+"\n"
-        header += repr(self.target_RGB)+"\n"
-        header += "{};{};{}; num image".format(tlabel, xlabel, ylabel)
-        fmt = (tformat, xformat, yformat, "%d")
+        targets = self.targets()
+        if len(targets) == 1:
+            header += repr(self.target_RGB)+"\n"
+            header += "{};{};{}; num image".format(tlabel, xlabel, ylabel)
+        else:
+            # one line for the colors, one pair of columns for each target:
+            header += "array({})".format(self.targets_RGB.tolist())+"\n"
+            header += tlabel
+            for k in range(1, len(targets)+1):
+                header += ";{}{}".format(xlabel[0], k)+xlabel[1:]
+                header += ";{}{}".format(ylabel[0], k)+ylabel[1:]
+            header += "; num image"
+        fmt = (tformat,) + (xformat, yformat)*len(targets) + ("%d",)
         data = []
         data.append(time)
-        data.append((self.__target_pos[0]*scale).tolist())
-        data.append((self.__target_pos[1]*scale).tolist())
+        for target_pos, _ in targets:
+            data.append((target_pos[0]*scale).tolist())
+            data.append((target_pos[1]*scale).tolist())
         data.append(self.__target_pos[2].tolist())
         data = np.array(data)
 